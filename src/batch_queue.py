@@ -0,0 +1,427 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import threading
+import importlib
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+sys.path.append(str(Path(__file__).parent))
+
+from parser import scan_data_folder
+
+DEFAULT_LEASE_TIMEOUT = 300.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON so that readers on any host see either nothing or the whole file."""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _task_id(file_path: str) -> str:
+    return Path(file_path).name
+
+
+def create_manifest(folder_path: str, queue_dir: str, overwrite: bool = False) -> List[str]:
+    """
+    Write the list of files to parse into a queue folder.
+
+    Args:
+        folder_path: Path to the folder containing TIFF files (must be
+            reachable under the same path from every worker host)
+        queue_dir: Shared folder holding the manifest, leases and results
+        overwrite: Replace an existing manifest
+
+    Returns:
+        List of file paths in the manifest
+    """
+    queue = Path(queue_dir)
+    manifest_path = queue / "manifest.json"
+
+    if manifest_path.exists() and not overwrite:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['files']
+
+    files = [str(Path(f).resolve()) for f in scan_data_folder(folder_path)]
+
+    for sub in ("leases", "results", "failed"):
+        (queue / sub).mkdir(parents=True, exist_ok=True)
+    _write_json_atomic(manifest_path, {'files': files, 'created': time.time()})
+
+    return files
+
+
+def load_manifest(queue_dir: str) -> List[str]:
+    """
+    Read the files of a queue.
+
+    Args:
+        queue_dir: Shared queue folder
+
+    Returns:
+        List of file paths in the manifest
+    """
+    with open(Path(queue_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+        return json.load(f)['files']
+
+
+def _is_finished(queue: Path, task_id: str) -> bool:
+    return (queue / "results" / f"{task_id}.json").exists() or (queue / "failed" / f"{task_id}.json").exists()
+
+
+def _read_token(lease_path: Path) -> Optional[str]:
+    """Get the owner token of a lease, or None if it is missing or not fully written."""
+    try:
+        with open(lease_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('token')
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _remove_lease_if(lease_path: Path, should_remove: Callable[[Optional[str], float], bool]) -> bool:
+    """
+    Delete a lease file if it still is the lease the caller expects.
+
+    The lease is first renamed to a private name, which succeeds for only one
+    caller. The condition is then checked on the file that was actually moved,
+    since another worker may have replaced the lease after the caller looked
+    at it. A lease that fails the check is put back, unless a new lease has
+    been created in the meantime.
+
+    Args:
+        lease_path: Path of the lease file
+        should_remove: Called with the moved lease's token and age in seconds
+
+    Returns:
+        True if the lease was deleted
+    """
+    aside_path = lease_path.with_name(f"{lease_path.name}.{uuid.uuid4().hex}.aside")
+    try:
+        os.rename(lease_path, aside_path)
+    except FileNotFoundError:
+        return False
+
+    token = _read_token(aside_path)
+    age = time.time() - aside_path.stat().st_mtime
+    if should_remove(token, age):
+        os.unlink(aside_path)
+        return True
+
+    try:
+        # Unlike rename, link does not replace a lease created in the meantime
+        os.link(aside_path, lease_path)
+    except FileExistsError:
+        pass
+    os.unlink(aside_path)
+    return False
+
+
+def try_claim(
+    queue_dir: str,
+    file_path: str,
+    worker_id: str,
+    lease_timeout: float = DEFAULT_LEASE_TIMEOUT
+) -> Optional[str]:
+    """
+    Try to take the lease on one file.
+
+    The lease is a file created with O_EXCL, so only one worker can hold it,
+    and it holds a token unique to this claim. Its modification time is the
+    holder's last heartbeat; a lease without a heartbeat for lease_timeout
+    seconds belongs to a crashed worker and is reclaimed, provided it is still
+    the same stale lease when it is moved aside.
+
+    Args:
+        queue_dir: Shared queue folder
+        file_path: File to claim
+        worker_id: Identifies the claiming worker
+        lease_timeout: Seconds without heartbeat after which a lease is stale
+
+    Returns:
+        Token of the new lease, or None if the file is finished or leased by another worker
+    """
+    queue = Path(queue_dir)
+    task_id = _task_id(file_path)
+    if _is_finished(queue, task_id):
+        return None
+
+    lease_path = queue / "leases" / f"{task_id}.lease"
+    token = uuid.uuid4().hex
+
+    for _ in range(2):
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            try:
+                age = time.time() - lease_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < lease_timeout:
+                return None
+
+            stale_token = _read_token(lease_path)
+            if not _remove_lease_if(
+                lease_path,
+                lambda moved_token, moved_age: moved_token == stale_token and moved_age >= lease_timeout
+            ):
+                return None
+            print(f"Reclaiming stale lease on {task_id} ({age:.0f}s without heartbeat)")
+            continue
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'token': token,
+                'worker': worker_id,
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'claimed_at': time.time()
+            }, f)
+
+        # The task may have finished between the check above and the claim
+        if _is_finished(queue, task_id):
+            release_lease(queue_dir, file_path, token)
+            return None
+        return token
+
+    return None
+
+
+def release_lease(queue_dir: str, file_path: str, token: str) -> bool:
+    """
+    Release a lease, unless it has been reclaimed by another worker.
+
+    Args:
+        queue_dir: Shared queue folder
+        file_path: File the lease is on
+        token: Token returned by try_claim
+
+    Returns:
+        True if the lease was released
+    """
+    lease_path = Path(queue_dir) / "leases" / f"{_task_id(file_path)}.lease"
+    return _remove_lease_if(lease_path, lambda moved_token, moved_age: moved_token == token)
+
+
+class _Heartbeat:
+    """Keep a lease fresh while its file is being parsed."""
+
+    def __init__(self, lease_path: Path, token: str, interval: float):
+        self.lease_path = lease_path
+        self.token = token
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            token = _read_token(self.lease_path)
+            if token is None:
+                # Moved aside by another worker checking it, and put back unless it was stale
+                continue
+            if token != self.token:
+                # Reclaimed by another worker; our result is still written atomically
+                return
+            try:
+                os.utime(self.lease_path)
+            except FileNotFoundError:
+                continue
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_task(
+    queue_dir: str,
+    file_path: str,
+    token: str,
+    parse_fn: Callable[..., Dict[str, Any]],
+    lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+    **parse_options
+) -> bool:
+    """
+    Parse a claimed file, store its result and release the lease.
+
+    Args:
+        queue_dir: Shared queue folder
+        file_path: File this worker holds the lease on
+        token: Token returned by try_claim
+        parse_fn: Function parsing one file (e.g. parse_single_tiff)
+        lease_timeout: Seconds without heartbeat after which a lease is stale
+        **parse_options: Options passed on to parse_fn
+
+    Returns:
+        True if the file was parsed successfully
+    """
+    queue = Path(queue_dir)
+    task_id = _task_id(file_path)
+    lease_path = queue / "leases" / f"{task_id}.lease"
+
+    try:
+        with _Heartbeat(lease_path, token, lease_timeout / 3):
+            try:
+                result = parse_fn(file_path, **parse_options)
+            except Exception as e:
+                print(f"Error parsing {file_path}: {e}")
+                _write_json_atomic(queue / "failed" / f"{task_id}.json", {
+                    'filepath': file_path,
+                    'error': f"{type(e).__name__}: {e}",
+                    'worker': socket.gethostname(),
+                    'failed_at': time.time()
+                })
+                return False
+
+            _write_json_atomic(queue / "results" / f"{task_id}.json", result)
+            return True
+    finally:
+        release_lease(queue_dir, file_path, token)
+
+
+def get_queue_status(queue_dir: str, lease_timeout: float = DEFAULT_LEASE_TIMEOUT) -> Dict[str, int]:
+    """
+    Count the files of a queue by state.
+
+    Args:
+        queue_dir: Shared queue folder
+        lease_timeout: Seconds without heartbeat after which a lease is stale
+
+    Returns:
+        Dictionary with counts of 'total', 'done', 'failed', 'running', 'stale' and 'pending' files
+    """
+    queue = Path(queue_dir)
+    status = {'total': 0, 'done': 0, 'failed': 0, 'running': 0, 'stale': 0, 'pending': 0}
+    now = time.time()
+
+    for file_path in load_manifest(queue_dir):
+        task_id = _task_id(file_path)
+        status['total'] += 1
+        lease_path = queue / "leases" / f"{task_id}.lease"
+
+        if (queue / "results" / f"{task_id}.json").exists():
+            status['done'] += 1
+        elif (queue / "failed" / f"{task_id}.json").exists():
+            status['failed'] += 1
+        else:
+            try:
+                age = now - lease_path.stat().st_mtime
+                status['running' if age < lease_timeout else 'stale'] += 1
+            except FileNotFoundError:
+                status['pending'] += 1
+
+    return status
+
+
+def run_worker(
+    queue_dir: str,
+    worker_id: Optional[str] = None,
+    parse_fn: Optional[Callable[..., Dict[str, Any]]] = None,
+    lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    **parse_options
+) -> int:
+    """
+    Claim and parse files from a queue until every file is done or failed.
+
+    While other workers still hold leases, the worker keeps polling so that
+    it can take over files from workers that crash.
+
+    Args:
+        queue_dir: Shared queue folder
+        worker_id: Identifies this worker (defaults to host name and process id)
+        parse_fn: Function parsing one file (defaults to parse_single_tiff)
+        lease_timeout: Seconds without heartbeat after which a lease is stale
+        poll_interval: Seconds to wait before looking for reclaimable files again
+        **parse_options: Options passed on to parse_fn
+
+    Returns:
+        Number of files this worker parsed successfully
+    """
+    if parse_fn is None:
+        from parser import parse_single_tiff
+        parse_fn = parse_single_tiff
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    files = load_manifest(queue_dir)
+    parsed = 0
+
+    while True:
+        claimed_any = False
+        for file_path in files:
+            token = try_claim(queue_dir, file_path, worker_id, lease_timeout)
+            if token is not None:
+                claimed_any = True
+                print(f"[{worker_id}] Parsing: {Path(file_path).name}")
+                if process_task(queue_dir, file_path, token, parse_fn, lease_timeout, **parse_options):
+                    parsed += 1
+
+        if claimed_any:
+            continue
+
+        status = get_queue_status(queue_dir, lease_timeout)
+        if status['running'] == 0 and status['stale'] == 0 and status['pending'] == 0:
+            return parsed
+        time.sleep(poll_interval)
+
+
+def _load_function(spec: str) -> Callable[..., Dict[str, Any]]:
+    """Import a function given as 'module:function'."""
+    module_name, function_name = spec.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Parse a folder with several workers sharing a filesystem")
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    manifest_parser = subparsers.add_parser("manifest", help="Create the queue of files to parse")
+    manifest_parser.add_argument("folder", help="Folder containing TIFF files")
+    manifest_parser.add_argument("queue", help="Shared queue folder")
+    manifest_parser.add_argument("--overwrite", action="store_true", help="Replace an existing manifest")
+
+    work_parser = subparsers.add_parser("work", help="Run a worker until the queue is done")
+    work_parser.add_argument("queue", help="Shared queue folder")
+    work_parser.add_argument("--worker-id", help="Worker name (defaults to host-pid)")
+    work_parser.add_argument("--lease-timeout", type=float, default=DEFAULT_LEASE_TIMEOUT)
+    work_parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    work_parser.add_argument("--strategy", help="Unstructured partitioning strategy")
+    work_parser.add_argument(
+        "--parse-fn",
+        help="Parse function as module:function (defaults to parser:parse_single_tiff)"
+    )
+
+    status_parser = subparsers.add_parser("status", help="Show progress of a queue")
+    status_parser.add_argument("queue", help="Shared queue folder")
+
+    args = arg_parser.parse_args()
+
+    if args.command == "manifest":
+        manifest_files = create_manifest(args.folder, args.queue, args.overwrite)
+        print(f"Queued {len(manifest_files)} files in {args.queue}")
+    elif args.command == "work":
+        options = {'strategy': args.strategy} if args.strategy else {}
+        count = run_worker(
+            args.queue,
+            worker_id=args.worker_id,
+            parse_fn=_load_function(args.parse_fn) if args.parse_fn else None,
+            lease_timeout=args.lease_timeout,
+            poll_interval=args.poll_interval,
+            **options
+        )
+        print(f"Parsed {count} files")
+    else:
+        print(json.dumps(get_queue_status(args.queue), indent=2))
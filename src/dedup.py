@@ -0,0 +1,400 @@
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_MAX_DISTANCE = 10
+
+# Pages whose hashes match are only candidates; they must also pass a pixel
+# comparison. The thresholds were calibrated on A4 text pages: pages with the
+# same layout but different text score about 0.4, rescans (resampled, blurred,
+# shifted, noisy or rotated by up to 0.6 degrees) score 0.69 or more. Pages
+# sharing a template (forms, ledgers) can score 0.8 or more and still differ.
+DEFAULT_MIN_SIMILARITY = 0.6
+MIN_TILE_SIMILARITY = 0.3
+CONFIRM_SIZE = (512, 724)
+CONFIRM_GRID = 4
+MAX_SHIFT = 6
+MAX_CANDIDATES = 8
+
+# Reusing a result copies its text, so it needs the much stricter check of
+# ink_difference. Calibrated on forms, ledgers and text pages at 300 dpi:
+# rescans (blurred, noisy, JPEG, shifted or rotated by up to 0.3 degrees)
+# leave at most 2 pixels, a single changed digit in 8 pt text leaves 6 or
+# more. On blurred scans below about 300 dpi a changed digit can leave none,
+# so smaller pages are never reused.
+MAX_INK_DIFFERENCE = 2
+MIN_REUSE_SIDE = 3300
+INK_CHECK_MAX_SIDE = 3508
+INK_CHECK_GRID = 12
+INK_WINDOW = 36
+INK_SEARCH_FACTOR = 4
+INK_SEARCH_RADIUS = 8
+
+
+def compute_dhash(image_path: str, hash_size: int = 8) -> int:
+    """
+    Compute the difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail
+    and each bit records whether a pixel is brighter than its right neighbour,
+    so rescans of the same page at other resolutions get (nearly) equal hashes.
+
+    Args:
+        image_path: Path to the image file
+        hash_size: Number of bits per row and column of the hash
+
+    Returns:
+        Hash as an integer of hash_size * hash_size bits
+    """
+    with Image.open(image_path) as img:
+        thumb = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def load_thumbnail(image_path: str, size: Tuple[int, int] = CONFIRM_SIZE) -> np.ndarray:
+    """
+    Load a grayscale thumbnail large enough to tell words apart.
+
+    Args:
+        image_path: Path to the image file
+        size: (width, height) of the thumbnail; every page is resized to the
+            same size so that rescans at other resolutions can be compared
+
+    Returns:
+        2D float32 array
+    """
+    with Image.open(image_path) as img:
+        thumb = img.convert('L').resize(size, Image.BOX)
+
+    return np.asarray(thumb, dtype=np.float32)
+
+
+def page_similarity(
+    thumb_a: np.ndarray,
+    thumb_b: np.ndarray,
+    grid: int = CONFIRM_GRID,
+    max_shift: int = MAX_SHIFT
+) -> Tuple[float, float]:
+    """
+    Compare two page thumbnails tile by tile.
+
+    Each tile of thumb_b is aligned to the matching tile of thumb_a by phase
+    correlation (within max_shift pixels), which absorbs the small shifts
+    and rotations of a rescan, and the aligned tiles are then correlated.
+    Tiles that are blank on both pages are skipped.
+
+    Args:
+        thumb_a: Thumbnail from load_thumbnail
+        thumb_b: Thumbnail of the same size
+        grid: Number of tiles per row and column
+        max_shift: Largest shift in pixels searched when aligning a tile
+
+    Returns:
+        Tuple of (median, lowest) correlation over the tiles, each between -1 and 1
+    """
+    height, width = thumb_a.shape
+    tile_h, tile_w = height // grid, width // grid
+    m = max_shift
+    scores = []
+
+    for row in range(grid):
+        for col in range(grid):
+            window = (slice(row * tile_h, (row + 1) * tile_h), slice(col * tile_w, (col + 1) * tile_w))
+            tile_a, tile_b = thumb_a[window], thumb_b[window]
+            if tile_a.std() < 8 and tile_b.std() < 8:
+                continue
+
+            a = tile_a - tile_a.mean()
+            b = tile_b - tile_b.mean()
+
+            # Phase correlation: the peak is at the shift that best aligns b to a
+            cross = np.fft.rfft2(a) * np.conj(np.fft.rfft2(b))
+            cross /= np.abs(cross) + 1e-9
+            surface = np.fft.fftshift(np.fft.irfft2(cross, s=a.shape))
+            cy, cx = tile_h // 2, tile_w // 2
+            search = surface[cy - m:cy + m + 1, cx - m:cx + m + 1]
+            dy, dx = np.unravel_index(np.argmax(search), search.shape)
+
+            # Drop the margin so pixels wrapped around by the roll are not compared
+            aligned = np.roll(b, (dy - m, dx - m), axis=(0, 1))[m:-m, m:-m]
+            a = a[m:-m, m:-m]
+            norm = np.sqrt((a * a).sum() * (aligned * aligned).sum())
+            scores.append(float((a * aligned).sum() / norm) if norm > 0 else 0.0)
+
+    if not scores:
+        # Both pages are blank
+        return 1.0, 1.0
+
+    return float(np.median(scores)), min(scores)
+
+
+def _ink_masks(gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Split a page into certain ink and possible ink (including faint edges and light rules)."""
+    paper, ink = np.percentile(gray, [90, 0.5])
+    return gray < ink + 0.35 * (paper - ink), gray < ink + 0.6 * (paper - ink)
+
+
+def _dilate(mask: np.ndarray, radius: int = 1) -> np.ndarray:
+    """Grow a mask by radius pixels in every direction."""
+    height, width = mask.shape
+    padded = np.pad(mask, radius)
+    grown = mask.copy()
+    for dy in range(2 * radius + 1):
+        for dx in range(2 * radius + 1):
+            grown |= padded[dy:dy + height, dx:dx + width]
+    return grown
+
+
+def _pool(mask: np.ndarray, factor: int) -> np.ndarray:
+    """Shrink a mask by factor, keeping a pixel if any pixel of its block is set."""
+    height, width = mask.shape[0] // factor, mask.shape[1] // factor
+    return mask[:height * factor, :width * factor].reshape(height, factor, width, factor).any(axis=(1, 3))
+
+
+def _best_offset(
+    ink_a: np.ndarray,
+    allowed_a: np.ndarray,
+    ink_b: np.ndarray,
+    allowed_b: np.ndarray,
+    window: Tuple[int, int, int, int],
+    center: Tuple[int, int],
+    radius: int
+) -> Tuple[int, np.ndarray]:
+    """
+    Find the shift of page b that leaves the least unmatched ink in a window of page a.
+
+    Page b's masks are padded by at least radius plus the center offset.
+    Shifts closest to center win ties.
+
+    Returns:
+        Tuple of ((dy, dx) shift, mask of the unmatched ink at that shift)
+    """
+    y0, y1, x0, x1 = window
+    pad = (ink_b.shape[0] - ink_a.shape[0]) // 2
+    cy, cx = center
+    shifts = sorted(
+        ((dy, dx) for dy in range(cy - radius, cy + radius + 1) for dx in range(cx - radius, cx + radius + 1)),
+        key=lambda shift: abs(shift[0] - cy) + abs(shift[1] - cx)
+    )
+
+    best_shift, best_unmatched, best_count = center, None, -1
+    for dy, dx in shifts:
+        moved = (slice(pad + y0 - dy, pad + y1 - dy), slice(pad + x0 - dx, pad + x1 - dx))
+        unmatched = (ink_a[y0:y1, x0:x1] & ~allowed_b[moved]) | (ink_b[moved] & ~allowed_a[y0:y1, x0:x1])
+        count = int(unmatched.sum())
+        if best_unmatched is None or count < best_count:
+            best_shift, best_unmatched, best_count = (dy, dx), unmatched, count
+            if count == 0:
+                break
+
+    return best_shift, best_unmatched
+
+
+def ink_difference(path_a: str, path_b: str, window: int = INK_WINDOW) -> int:
+    """
+    Measure how much ink differs between two pages, to decide whether a result can be reused.
+
+    Both pages are compared at the original's size, capped at that of an A4
+    page at 300 dpi. Certain ink on one page
+    must have possible ink within one pixel on the other page, which absorbs
+    resampling, blur and contrast changes of a rescan. The pages are aligned
+    tile by tile (coarse search on reduced masks, then to the pixel), so
+    shifts and slight rotations do not count as differences, while a changed
+    digit does.
+
+    Args:
+        path_a: Path to the original page
+        path_b: Path to the page compared with it
+        window: Side in pixels of the square in which unmatched ink is counted
+
+    Returns:
+        Largest number of unmatched ink pixels in any window of that size
+    """
+    with Image.open(path_a) as img_a, Image.open(path_b) as img_b:
+        scale = min(1.0, INK_CHECK_MAX_SIDE / max(img_a.size))
+        size = (round(img_a.width * scale), round(img_a.height * scale))
+        gray_a = np.asarray(img_a.convert('L').resize(size, Image.BOX), dtype=np.float32)
+        gray_b = np.asarray(img_b.convert('L').resize(size, Image.BOX), dtype=np.float32)
+
+    ink_a, maybe_a = _ink_masks(gray_a)
+    ink_b, maybe_b = _ink_masks(gray_b)
+    allowed_a, allowed_b = _dilate(maybe_a), _dilate(maybe_b)
+
+    # Coarse alignment searches reduced masks, the fine one the pixels around it
+    factor, radius = INK_SEARCH_FACTOR, INK_SEARCH_RADIUS
+    coarse_a, coarse_b = _pool(ink_a, factor), _pool(ink_b, factor)
+    coarse_b = np.pad(coarse_b, radius)
+    pad = (radius + 1) * factor
+    ink_b, allowed_b = np.pad(ink_b, pad), np.pad(allowed_b, pad)
+
+    height, width = ink_a.shape
+    tile_h, tile_w = height // INK_CHECK_GRID, width // INK_CHECK_GRID
+    worst = 0
+
+    for row in range(INK_CHECK_GRID):
+        for col in range(INK_CHECK_GRID):
+            y0, x0 = row * tile_h, col * tile_w
+            y1 = height if row == INK_CHECK_GRID - 1 else y0 + tile_h
+            x1 = width if col == INK_CHECK_GRID - 1 else x0 + tile_w
+
+            coarse_window = (y0 // factor, y1 // factor, x0 // factor, x1 // factor)
+            (dy, dx), _ = _best_offset(coarse_a, coarse_a, coarse_b, coarse_b, coarse_window, (0, 0), radius)
+            _, unmatched = _best_offset(
+                ink_a, allowed_a, ink_b, allowed_b, (y0, y1, x0, x1), (dy * factor, dx * factor), factor
+            )
+            if not unmatched.any():
+                continue
+
+            # Unmatched ink in every window of the tile, from the summed-area table
+            table = np.pad(unmatched.astype(np.int32).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+            k = min(window, *unmatched.shape)
+            sums = table[k:, k:] - table[:-k, k:] - table[k:, :-k] + table[:-k, :-k]
+            worst = max(worst, int(sums.max()))
+
+    return worst
+
+
+def can_reuse_result(
+    original_path: str,
+    duplicate_path: str,
+    max_ink_difference: int = MAX_INK_DIFFERENCE
+) -> bool:
+    """
+    Decide whether the parse result of a page may be copied to its duplicate.
+
+    find_duplicate_pages also matches pages that only share a template, so
+    this check is run before a result is reused. Both pages must be scanned
+    at about 300 dpi or more, and ink_difference must find no more than
+    max_ink_difference pixels of differing ink anywhere on the page.
+
+    Args:
+        original_path: Path to the page whose result would be copied
+        duplicate_path: Path to the page that would receive it
+        max_ink_difference: Largest number of unmatched ink pixels in any window
+
+    Returns:
+        True if the pages show the same content
+    """
+    try:
+        with Image.open(original_path) as original, Image.open(duplicate_path) as duplicate:
+            if min(max(original.size), max(duplicate.size)) < MIN_REUSE_SIDE:
+                return False
+
+        return ink_difference(original_path, duplicate_path) <= max_ink_difference
+    except Exception as e:
+        print(f"Error comparing {duplicate_path} with {original_path}: {e}")
+        return False
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """
+    Count the differing bits of two hashes.
+
+    Args:
+        hash_a: First hash
+        hash_b: Second hash
+
+    Returns:
+        Number of differing bits
+    """
+    return (hash_a ^ hash_b).bit_count()
+
+
+def find_duplicate_pages(
+    file_paths: List[str],
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY
+) -> Dict[str, str]:
+    """
+    Find near-duplicate pages, such as rescans of the same page.
+
+    Pages whose dHash is within max_distance of an earlier page are only
+    candidates: a 64-bit hash cannot tell apart text pages with the same
+    layout, so each candidate is confirmed with page_similarity on larger
+    thumbnails before it is reported.
+
+    Args:
+        file_paths: Paths to the page images, in parsing order
+        max_distance: Largest hash distance (in bits) for a candidate
+        min_similarity: Smallest median tile correlation treated as a duplicate
+
+    Returns:
+        Dictionary mapping each duplicate's path to the path of the first
+        page it duplicates (pages without duplicates are not included)
+    """
+    duplicates = {}
+    original_paths = []
+    original_hashes = np.empty(0, dtype=np.uint64)
+    # Thumbnails are only loaded for candidates; keep the recent ones for the next pages
+    get_thumbnail = lru_cache(maxsize=32)(load_thumbnail)
+
+    for file_path in file_paths:
+        try:
+            page_hash = np.uint64(compute_dhash(file_path))
+        except Exception as e:
+            print(f"Error hashing {file_path}: {e}")
+            continue
+
+        if len(original_hashes):
+            # Distance to every distinct page seen so far in one pass
+            xor = np.bitwise_xor(original_hashes, page_hash)
+            distances = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+            candidates = [
+                int(i) for i in np.argsort(distances, kind='stable')[:MAX_CANDIDATES]
+                if distances[i] <= max_distance
+            ]
+
+            original = None
+            for i in candidates:
+                try:
+                    median, lowest = page_similarity(get_thumbnail(original_paths[i]), get_thumbnail(file_path))
+                except Exception as e:
+                    print(f"Error comparing {file_path}: {e}")
+                    break
+                if median >= min_similarity and lowest >= MIN_TILE_SIMILARITY:
+                    original = original_paths[i]
+                    break
+
+            if original is not None:
+                duplicates[file_path] = original
+                continue
+
+        original_paths.append(file_path)
+        original_hashes = np.append(original_hashes, page_hash)
+
+    return duplicates
+
+
+def rescale_elements(
+    elements: List[Dict[str, Any]],
+    source_size: Tuple[int, int],
+    target_size: Tuple[int, int]
+) -> List[Dict[str, Any]]:
+    """
+    Copy elements parsed on one image to another image of a different size.
+
+    Args:
+        elements: List of element dictionaries from the source image
+        source_size: (width, height) of the source image
+        target_size: (width, height) of the target image
+
+    Returns:
+        New list of elements with coordinates scaled to the target image
+    """
+    scale_x = target_size[0] / source_size[0]
+    scale_y = target_size[1] / source_size[1]
+
+    rescaled = []
+    for element in elements:
+        coords = element['coordinates']
+        if coords is not None:
+            coords = [(x * scale_x, y * scale_y) for x, y in coords]
+        rescaled.append({**element, 'coordinates': coords})
+
+    return rescaled
@@ -0,0 +1,469 @@
+import sys
+import csv
+import json
+import time
+import resource
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+sys.path.append(str(Path(__file__).parent))
+
+from parser import (
+    scan_data_folder,
+    parse_single_tiff,
+    get_result_key,
+    get_reused_result_key,
+    load_cached_result,
+    RESULTS_CACHE_DIR
+)
+from preprocessing import DEFAULT_PREPROCESS_OPTIONS
+from journal import load_journal, replay_journal, JOURNAL_DIR
+from utils import initialize_edit_tracking, get_current_elements, compute_file_hash
+
+EVALUATION_OUTPUT_DIR = "output/evaluation"
+
+# Parse configurations compared by default (keyword arguments of parse_single_tiff)
+EVALUATION_CONFIGS = {
+    'default': {},
+    'no_tables': {'infer_table_structure': False},
+    'preprocessed': {'preprocess': DEFAULT_PREPROCESS_OPTIONS},
+    'ocr_only': {'strategy': 'ocr_only'},
+    'ocr_only_preprocessed': {'strategy': 'ocr_only', 'preprocess': DEFAULT_PREPROCESS_OPTIONS}
+}
+
+
+def _read_rss_bytes() -> Optional[int]:
+    """Current resident memory of this process (None where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _PeakMemorySampler:
+    """Track the peak resident memory of this process while a block runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            rss = _read_rss_bytes()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # Without /proc, fall back to the high-water mark of the whole process
+        if self.peak is None:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its finished children (e.g. Tesseract)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure_parse(file_path: str, parse_options: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Parse a page and measure what it cost.
+
+    Preprocessed rasters are written to an empty temporary folder, so the
+    cost of preprocessing is always measured instead of being skipped for
+    pages preprocessed by an earlier run.
+
+    Args:
+        file_path: Path to the TIFF file
+        parse_options: Keyword arguments for parse_single_tiff
+
+    Returns:
+        Tuple of (parse result, metrics with latency_s, cpu_s and peak_rss_mb)
+    """
+    with tempfile.TemporaryDirectory(prefix='evaluation_preprocessed_') as preprocess_cache_dir:
+        cpu_start = _cpu_seconds()
+        wall_start = time.perf_counter()
+
+        with _PeakMemorySampler() as sampler:
+            result = parse_single_tiff(file_path, preprocess_cache_dir=preprocess_cache_dir, **parse_options)
+
+        metrics = {
+            'latency_s': time.perf_counter() - wall_start,
+            'cpu_s': _cpu_seconds() - cpu_start,
+            'peak_rss_mb': sampler.peak / (1024 * 1024)
+        }
+
+    return result, metrics
+
+
+def word_edit_distance(hypothesis: str, reference: str) -> float:
+    """
+    Word-level edit distance normalized by the length of the reference.
+
+    Args:
+        hypothesis: Text produced by OCR
+        reference: Reviewer-corrected text
+
+    Returns:
+        Number of word insertions, deletions and substitutions per reference word
+    """
+    hyp = hypothesis.split()
+    ref = reference.split()
+
+    if not ref:
+        return float(len(hyp) > 0)
+
+    previous = list(range(len(ref) + 1))
+    for i, hyp_word in enumerate(hyp, 1):
+        current = [i]
+        for j, ref_word in enumerate(ref, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (hyp_word != ref_word)
+            ))
+        previous = current
+
+    return previous[-1] / len(ref)
+
+
+def _bbox(coordinates: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
+    xs = [p[0] for p in coordinates]
+    ys = [p[1] for p in coordinates]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _iou(box_a: Tuple[float, ...], box_b: Tuple[float, ...]) -> float:
+    left, top = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    right, bottom = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    intersection = max(0.0, right - left) * max(0.0, bottom - top)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def type_relabel_rate(
+    elements: List[Dict[str, Any]],
+    reference_elements: List[Dict[str, Any]],
+    min_iou: float = 0.5
+) -> float:
+    """
+    Share of reference elements a reviewer would have to relabel in the output.
+
+    Each reference element is matched to the output element with the largest
+    box overlap; it counts as needing a relabel when there is no match with
+    IoU >= min_iou or the matched element has a different type.
+
+    Args:
+        elements: Elements produced by a parse configuration
+        reference_elements: Reviewer-corrected elements
+        min_iou: Smallest box overlap counted as the same element
+
+    Returns:
+        Relabel rate between 0.0 and 1.0
+    """
+    boxes = [(_bbox(e['coordinates']), e['type']) for e in elements if e['coordinates']]
+    references = [(_bbox(e['coordinates']), e['type']) for e in reference_elements if e['coordinates']]
+
+    if not references:
+        return 0.0
+
+    relabels = 0
+    for ref_box, ref_type in references:
+        best_iou, best_type = 0.0, None
+        for box, element_type in boxes:
+            iou = _iou(ref_box, box)
+            if iou > best_iou:
+                best_iou, best_type = iou, element_type
+        if best_iou < min_iou or best_type != ref_type:
+            relabels += 1
+
+    return relabels / len(references)
+
+
+def load_reference(
+    file_path: str,
+    reference_options: Dict[str, Any],
+    include_unreviewed: bool = False,
+    cache_dir: str = RESULTS_CACHE_DIR,
+    journal_dir: str = JOURNAL_DIR
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the reviewer-corrected elements of a page.
+
+    The reference is the saved parse reviewers worked on, with their edit
+    journal replayed onto it. For a duplicate page this may be the result
+    copied from its original, which is saved under its own key.
+
+    Args:
+        file_path: Path to the TIFF file
+        reference_options: Parse options of the result reviewers corrected
+        include_unreviewed: Treat pages without any edits as correct
+        cache_dir: Folder holding saved parse results
+        journal_dir: Folder holding the edit journals
+
+    Returns:
+        Dictionary with the 'result_key' used and the corrected 'elements',
+        or None if the page has no usable reference
+    """
+    result_key = get_result_key(compute_file_hash(file_path), reference_options)
+    keys = [result_key, get_reused_result_key(result_key)]
+    journals = {key: load_journal(key, journal_dir) for key in keys}
+
+    # Reviewed results first; unreviewed ones only count as correct if asked to
+    candidates = [key for key in keys if journals[key]]
+    if include_unreviewed:
+        candidates += [key for key in keys if not journals[key]]
+
+    for key in candidates:
+        result = load_cached_result(file_path, key, cache_dir)
+        if result is not None:
+            edit_tracking = replay_journal(initialize_edit_tracking(), journals[key], result['elements'])
+            return {'result_key': key, 'elements': get_current_elements(edit_tracking, result['elements'])}
+
+    return None
+
+
+def find_edited_keys(file_path: str, journal_dir: str = JOURNAL_DIR) -> List[str]:
+    """
+    Find the result keys of a page that reviewers have edited, whatever the parse options.
+
+    Args:
+        file_path: Path to the TIFF file
+        journal_dir: Folder holding the edit journals
+
+    Returns:
+        Sorted result keys with a non-empty edit journal
+    """
+    content_hash = compute_file_hash(file_path)
+    keys = [path.stem for path in Path(journal_dir).glob(f"{content_hash}*.jsonl")]
+    return sorted(key for key in keys if load_journal(key, journal_dir))
+
+
+def evaluate_folder(
+    folder_path: str,
+    configs: Optional[Dict[str, Dict[str, Any]]] = None,
+    reference_options: Optional[Dict[str, Any]] = None,
+    include_unreviewed: bool = False,
+    warmup: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Run every page of a folder through several parse configurations.
+
+    Args:
+        folder_path: Path to the folder containing TIFF files
+        configs: Mapping of configuration name to parse_single_tiff options
+            (defaults to EVALUATION_CONFIGS)
+        reference_options: Parse options of the results reviewers corrected
+        include_unreviewed: Treat pages without any edits as correct
+        warmup: Parse the first page once per configuration before measuring,
+            so model loading is not counted against the first page
+
+    Returns:
+        One row per page and configuration with cost and quality metrics
+    """
+    configs = configs or EVALUATION_CONFIGS
+    reference_options = reference_options or {}
+    tiff_files = scan_data_folder(folder_path)
+
+    references = {}
+    unscored_edits = {}
+    for file_path in tiff_files:
+        reference = load_reference(file_path, reference_options, include_unreviewed)
+        references[file_path] = reference['elements'] if reference else None
+
+        # Edits made on a parse with other options, or whose saved result is gone
+        used_key = reference['result_key'] if reference else None
+        skipped = [key for key in find_edited_keys(file_path) if key != used_key]
+        if skipped:
+            print(f"Warning: edits of {Path(file_path).name} are not scored: {', '.join(skipped)}")
+            unscored_edits[file_path] = skipped
+
+    rows = []
+    for config_name, parse_options in configs.items():
+        if warmup and tiff_files:
+            measure_parse(tiff_files[0], parse_options)
+
+        for file_path in tiff_files:
+            print(f"[{config_name}] {Path(file_path).name}")
+            row = {'config': config_name, 'filename': Path(file_path).name}
+            if file_path in unscored_edits:
+                row['unscored_edits'] = ' '.join(unscored_edits[file_path])
+            try:
+                result, metrics = measure_parse(file_path, parse_options)
+            except Exception as e:
+                print(f"Error parsing {file_path}: {e}")
+                row['error'] = str(e)
+                rows.append(row)
+                continue
+
+            row.update(metrics)
+            row['elements'] = len(result['elements'])
+
+            reference = references[file_path]
+            if reference is not None:
+                reference_text = '\n\n'.join(e['text'] for e in reference)
+                row['word_edit_distance'] = word_edit_distance(result['full_text'], reference_text)
+                row['type_relabel_rate'] = type_relabel_rate(result['elements'], reference)
+
+            rows.append(row)
+
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregate per-page rows into one cost versus quality row per configuration.
+
+    Args:
+        rows: Rows from evaluate_folder
+
+    Returns:
+        One summary row per configuration, ordered by mean latency
+    """
+    def mean(values: List[float]) -> Optional[float]:
+        return sum(values) / len(values) if values else None
+
+    by_config = {}
+    for row in rows:
+        by_config.setdefault(row['config'], []).append(row)
+
+    summary = []
+    for config_name, config_rows in by_config.items():
+        parsed = [r for r in config_rows if 'error' not in r]
+        scored = [r for r in parsed if 'word_edit_distance' in r]
+        summary.append({
+            'config': config_name,
+            'pages': len(parsed),
+            'errors': len(config_rows) - len(parsed),
+            'mean_latency_s': mean([r['latency_s'] for r in parsed]),
+            'mean_cpu_s': mean([r['cpu_s'] for r in parsed]),
+            'max_peak_rss_mb': max((r['peak_rss_mb'] for r in parsed), default=None),
+            'scored_pages': len(scored),
+            'unscored_pages': sum('unscored_edits' in r for r in config_rows),
+            'mean_word_edit_distance': mean([r['word_edit_distance'] for r in scored]),
+            'mean_type_relabel_rate': mean([r['type_relabel_rate'] for r in scored])
+        })
+
+    return sorted(summary, key=lambda r: (r['mean_latency_s'] is None, r['mean_latency_s']))
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def write_report(
+    rows: List[Dict[str, Any]],
+    summary: List[Dict[str, Any]],
+    output_folder: str = EVALUATION_OUTPUT_DIR
+) -> str:
+    """
+    Write per-page results as CSV and the configuration summary as Markdown.
+
+    Args:
+        rows: Rows from evaluate_folder
+        summary: Rows from summarize
+        output_folder: Folder to write the report to
+
+    Returns:
+        Path to the Markdown summary
+    """
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+
+    fieldnames = []
+    for row in rows:
+        fieldnames.extend(k for k in row if k not in fieldnames)
+
+    with open(Path(output_folder) / "pages.csv", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    columns = list(summary[0].keys()) if summary else []
+    lines = [
+        "# OCR Configuration Report",
+        "",
+        "| " + " | ".join(columns) + " |",
+        "| " + " | ".join("---" for _ in columns) + " |"
+    ]
+    for row in summary:
+        lines.append("| " + " | ".join(_format_value(row[c]) for c in columns) + " |")
+
+    unscored = {row['filename']: row['unscored_edits'] for row in rows if 'unscored_edits' in row}
+    if unscored:
+        lines.extend([
+            "",
+            "## Edits Not Scored",
+            "",
+            "These pages have reviewer edits on a parse that is not the reference "
+            "(other parse options, or a saved result that is missing). "
+            "Set the reference with --reference-config or --reference-options.",
+            ""
+        ])
+        lines.extend(f"- {filename}: {keys}" for filename, keys in sorted(unscored.items()))
+
+    report_path = Path(output_folder) / "summary.md"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+    return str(report_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Compare OCR configurations by cost and correction effort")
+    arg_parser.add_argument("folder", help="Folder containing TIFF files")
+    arg_parser.add_argument(
+        "--configs",
+        nargs="+",
+        choices=list(EVALUATION_CONFIGS),
+        default=list(EVALUATION_CONFIGS),
+        help="Configurations to compare"
+    )
+    arg_parser.add_argument(
+        "--include-unreviewed",
+        action="store_true",
+        help="Treat pages without reviewer edits as correct"
+    )
+    arg_parser.add_argument(
+        "--reference-config",
+        choices=list(EVALUATION_CONFIGS),
+        default='default',
+        help="Configuration the reviewed results were parsed with in the app"
+    )
+    arg_parser.add_argument(
+        "--reference-options",
+        type=json.loads,
+        help="Parse options of the reviewed results as a JSON object (overrides --reference-config)"
+    )
+    arg_parser.add_argument("--output", default=EVALUATION_OUTPUT_DIR, help="Report folder")
+    args = arg_parser.parse_args()
+
+    page_rows = evaluate_folder(
+        args.folder,
+        configs={name: EVALUATION_CONFIGS[name] for name in args.configs},
+        reference_options=args.reference_options or EVALUATION_CONFIGS[args.reference_config],
+        include_unreviewed=args.include_unreviewed
+    )
+    report = write_report(page_rows, summarize(page_rows), args.output)
+    print(f"Report written to {report}")
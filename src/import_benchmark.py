@@ -0,0 +1,83 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List
+
+SRC_DIR = Path(__file__).parent
+
+DEFAULT_BUDGET_S = 3.0
+
+# Modules that must not be loaded just to show the UI or saved results
+DEFERRED_MODULES = [
+    'unstructured',
+    'unstructured_inference',
+    'pytesseract',
+    'torch',
+    'pandas'
+]
+
+_MEASURE_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module: str = 'interactive_ui') -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter and measure how long it takes.
+
+    Args:
+        module: Name of the module in src/ to import
+
+    Returns:
+        Dictionary with 'seconds' and the list of loaded 'modules'
+    """
+    script = _MEASURE_SCRIPT.format(src=str(SRC_DIR), module=module)
+    completed = subprocess.run(
+        [sys.executable, '-c', script],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def find_deferred_modules(modules: List[str], deferred: List[str] = DEFERRED_MODULES) -> List[str]:
+    """
+    List deferred packages that were loaded anyway.
+
+    Args:
+        modules: Names of loaded modules
+        deferred: Top-level packages that should not be loaded
+
+    Returns:
+        Deferred packages found among the loaded modules
+    """
+    loaded = {name.split('.')[0] for name in modules}
+    return [name for name in deferred if name in loaded]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Check the startup import time of the app")
+    arg_parser.add_argument("--module", default="interactive_ui", help="Module to import")
+    arg_parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="Time budget in seconds")
+    arg_parser.add_argument("--runs", type=int, default=3, help="Number of fresh interpreters to time")
+    args = arg_parser.parse_args()
+
+    measurements = [measure_import(args.module) for _ in range(args.runs)]
+    best = min(m['seconds'] for m in measurements)
+    unexpected = find_deferred_modules(measurements[0]['modules'])
+
+    print(f"import {args.module}: {best:.3f}s (best of {args.runs}, budget {args.budget:.1f}s)")
+    if unexpected:
+        print(f"Loaded at startup but should be deferred: {', '.join(unexpected)}")
+
+    if best > args.budget or unexpected:
+        sys.exit(1)
@@ -1,27 +1,190 @@
 import streamlit as st
 import sys
+import math
+import time
+from functools import partial
 from pathlib import Path
-import pandas as pd
 from PIL import Image
 
 sys.path.append(str(Path(__file__).parent))
 
-from parser import parse_all_tiffs, parse_region
-from visualizer import create_side_by_side_view, get_color_legend, draw_box_comparison
+from parser import (
+    parse_all_tiffs,
+    parse_single_tiff,
+    parse_region,
+    warm_parsing_stack,
+    load_cached_result,
+    RESULTS_CACHE_DIR
+)
+from ocr_worker import start_worker
+from preprocessing import DEFAULT_PREPROCESS_OPTIONS
+from region_cache import RegionCache, REGION_CACHE_DIR
+from live_preview import PreviewScheduler
+from result_store import SharedResultStore
+from visualizer import (
+    draw_bounding_boxes,
+    format_elements_text,
+    get_color_legend,
+    draw_box_comparison,
+    draw_box_comparison_crop
+)
+from journal import restore_edit_tracking, log_relabel, log_reparse, log_reset
 from utils import (
-    initialize_edit_tracking, 
     update_element_type, 
     replace_element_with_reparsed, 
     get_edit_summary,
     adjust_coordinates,
-    get_bounding_box_size
+    get_bounding_box_size,
+    get_element_summaries,
+    get_current_elements,
+    mark_element_edited,
+    filter_element_indices,
+    paginate
 )
 
 
+WORKER_RETRY_INTERVAL = 60.0
+
+# Time of the last failed worker start, kept outside the resource cache so the start is retried
+_worker_failure = {'time': None}
+
+
+@st.cache_resource
+def connect_ocr_worker():
+    """Connect to the warm OCR worker shared by all sessions (failures raise and are not cached)"""
+    return start_worker()
+
+
+def get_ocr_worker():
+    """The shared OCR worker, or None while a failed start waits to be retried"""
+    failed_at = _worker_failure['time']
+    if failed_at is not None and time.monotonic() - failed_at < WORKER_RETRY_INTERVAL:
+        return None
+
+    try:
+        worker = connect_ocr_worker()
+    except Exception as e:
+        _worker_failure['time'] = time.monotonic()
+        print(f"OCR worker unavailable, parsing in-process (retrying in {WORKER_RETRY_INTERVAL:.0f}s): {e}")
+        return None
+
+    _worker_failure['time'] = None
+    return worker
+
+
+@st.cache_resource
+def get_region_cache():
+    """Region OCR results shared by all sessions"""
+    return RegionCache(disk_dir=REGION_CACHE_DIR)
+
+
+@st.cache_resource
+def warm_local_parser():
+    """Load the parsing stack in the background once per process"""
+    return warm_parsing_stack()
+
+
+def with_worker_fallback(method_name: str, local_fn):
+    """
+    Wrap a worker method so that a lost worker connection falls back to local_fn.
+
+    The cached client is dropped on connection errors, so the next call
+    starts a new worker instead of failing against the dead one.
+    """
+    def parse(*args, **kwargs):
+        worker = get_ocr_worker()
+        if worker is not None:
+            try:
+                return getattr(worker, method_name)(*args, **kwargs)
+            except (EOFError, OSError) as e:
+                print(f"OCR worker connection lost, parsing in-process: {e}")
+                connect_ocr_worker.clear()
+        return local_fn(*args, **kwargs)
+    return parse
+
+
+def get_region_parser(use_worker: bool):
+    """Region parser of the warm OCR worker, or the in-process one"""
+    return with_worker_fallback('parse_region', parse_region) if use_worker else parse_region
+
+
+def _show_live_preview(preview_key: str):
+    """Show the OCR preview text of the adjusted box once it is ready"""
+    scheduler = st.session_state.get('preview_scheduler')
+    status, text = scheduler.result(preview_key) if scheduler else ('missing', None)
+    
+    st.markdown("**Live OCR preview:**")
+    if status == 'ready':
+        st.text_area(
+            "Preview text",
+            value=text,
+            height=200,
+            disabled=True,
+            label_visibility="collapsed"
+        )
+    elif status == 'error':
+        st.warning(f"Preview failed: {text}")
+    else:
+        st.caption("⏳ Reading adjusted region...")
+
+
+# Poll for the background preview without rerunning the whole page
+if hasattr(st, 'fragment'):
+    show_live_preview = st.fragment(run_every=0.5)(_show_live_preview)
+else:
+    show_live_preview = _show_live_preview
+
+
+def select_page(label: str, key: str, item_count: int, page_size: int) -> int:
+    """Page number input that stays valid when the number of pages shrinks"""
+    page_count = max(1, math.ceil(item_count / page_size))
+    if st.session_state.get(key, 1) > page_count:
+        st.session_state[key] = 1
+    return st.number_input(
+        f"{label} (of {page_count})",
+        min_value=1,
+        max_value=page_count,
+        step=1,
+        key=key
+    )
+
+
+@st.cache_resource
+def get_result_store():
+    """Read-only parse results shared by all sessions, reloaded from disk after eviction"""
+    return SharedResultStore(loader=lambda key: load_cached_result(key[0], key[1], RESULTS_CACHE_DIR))
+
+
 @st.cache_data
-def load_and_parse_tiffs(folder_path: str):
-    """Load and parse all TIFFs (cached to avoid re-parsing)"""
-    return parse_all_tiffs(folder_path)
+def load_and_parse_tiffs(
+    folder_path: str,
+    use_worker: bool = True,
+    preprocess: dict = None,
+    reuse_duplicates: bool = False
+):
+    """
+    Load and parse all TIFFs into the shared result store (cached to avoid re-parsing).
+    
+    Returns a small index mapping filenames to their store keys, so sessions
+    do not hold their own copies of the results.
+    """
+    results = parse_all_tiffs(
+        folder_path,
+        parse_fn=with_worker_fallback('parse_single_tiff', parse_single_tiff) if use_worker else None,
+        cache_dir=RESULTS_CACHE_DIR,
+        detect_duplicates=True,
+        reuse_duplicates=reuse_duplicates,
+        preprocess=preprocess
+    )
+    
+    store = get_result_store()
+    documents = {}
+    for filename, result in results.items():
+        key = (result['filepath'], result['result_key'])
+        store.put(key, result)
+        documents[filename] = {'key': key, 'duplicate_of': result.get('duplicate_of')}
+    
+    return documents
 
 
 def main():
@@ -37,33 +200,70 @@ def main():
     st.sidebar.header("Settings")
     
     data_folder = st.sidebar.text_input("Data Folder Path", value="data")
+    use_worker = st.sidebar.checkbox(
+        "Use warm OCR worker",
+        value=True,
+        help="Keep OCR models loaded in a background process between parses"
+    )
+    
+    reuse_duplicates = st.sidebar.checkbox(
+        "Reuse results for duplicate pages",
+        value=False,
+        help="Copy the parse result of a page with the same content (scanned at 300 dpi or more) instead of running OCR again"
+    )
+    
+    with st.sidebar.expander("Preprocessing", expanded=False):
+        use_preprocessing = st.checkbox(
+            "Preprocess scans before OCR",
+            value=False,
+            help="Downscale, deskew, binarize and crop borders before running OCR"
+        )
+        preprocess = None
+        if use_preprocessing:
+            preprocess = {
+                'target_dpi': st.number_input(
+                    "Target DPI",
+                    min_value=150,
+                    max_value=600,
+                    value=DEFAULT_PREPROCESS_OPTIONS['target_dpi'],
+                    step=50
+                ),
+                'deskew': st.checkbox("Deskew", value=DEFAULT_PREPROCESS_OPTIONS['deskew']),
+                'binarize': st.checkbox("Binarize", value=DEFAULT_PREPROCESS_OPTIONS['binarize']),
+                'crop_borders': st.checkbox("Crop borders", value=DEFAULT_PREPROCESS_OPTIONS['crop_borders'])
+            }
     
     if st.sidebar.button("Load/Reload TIFFs", type="primary"):
         with st.spinner("Parsing TIFF files..."):
-            results = load_and_parse_tiffs(data_folder)
-            st.session_state['parse_results'] = results
+            documents = load_and_parse_tiffs(data_folder, use_worker, preprocess, reuse_duplicates)
+            st.session_state['documents'] = documents
             # Clear edit tracking when reloading
             if 'edit_tracking' in st.session_state:
                 del st.session_state['edit_tracking']
-            if results:
-                st.sidebar.success(f"✓ Loaded {len(results)} TIFF files")
+            if documents:
+                st.sidebar.success(f"✓ Loaded {len(documents)} TIFF files")
             else:
                 st.sidebar.error("No TIFF files found")
     
     # Check if we have parsed results
-    if 'parse_results' not in st.session_state or not st.session_state['parse_results']:
+    if 'documents' not in st.session_state or not st.session_state['documents']:
         st.info("Click 'Load/Reload TIFFs' in the sidebar to start")
         return
     
-    results = st.session_state['parse_results']
+    documents = st.session_state['documents']
+    
+    # Re-parses will run in this process, so start loading OCR while the page renders
+    if not use_worker:
+        warm_local_parser()
     
     # File selection
     st.sidebar.markdown("---")
     st.sidebar.header("Select File")
     selected_file = st.sidebar.selectbox(
         "Select TIFF file to view",
-        options=list(results.keys()),
-        index=0
+        options=list(documents.keys()),
+        index=0,
+        format_func=lambda name: f"{name} (duplicate)" if documents[name]['duplicate_of'] else name
     )
     
     # Color scheme selection
@@ -76,6 +276,11 @@ def main():
     )
     
     show_numbers = st.sidebar.checkbox("Show Element Numbers", value=True)
+    page_size = st.sidebar.selectbox(
+        "Elements per Page",
+        options=[25, 50, 100, 250],
+        index=1
+    )
     
     # Color legend
     st.sidebar.markdown("---")
@@ -89,24 +294,32 @@ def main():
     
     # Main content area
     if selected_file:
-        file_data = results[selected_file]
+        file_data = get_result_store().get(documents[selected_file]['key'])
+        if file_data is None:
+            st.error("The parse result of this file is no longer available. Click 'Load/Reload TIFFs' to load it again.")
+            return
         
         # Get image dimensions
         img = Image.open(file_data['filepath'])
         img_width, img_height = img.size
         
-        # Initialize edit tracking for this file if not exists
+        # Initialize edit tracking for this file if not exists, restoring journaled edits
         if 'edit_tracking' not in st.session_state:
             st.session_state['edit_tracking'] = {}
         if selected_file not in st.session_state['edit_tracking']:
-            st.session_state['edit_tracking'][selected_file] = initialize_edit_tracking(file_data)
+            st.session_state['edit_tracking'][selected_file] = restore_edit_tracking(file_data)
         
-        # Get current (possibly edited) elements
+        # Get current (possibly edited) elements; the session keeps only its edits
         edit_tracking = st.session_state['edit_tracking'][selected_file]
-        current_elements = edit_tracking['current']
+        current_elements = get_current_elements(edit_tracking, file_data['elements'])
         
         # Display file info
         st.header(f"📄 {selected_file}")
+        # Taken from the index, as results reloaded from disk do not carry it
+        duplicate_of = documents[selected_file]['duplicate_of']
+        if duplicate_of:
+            reused_note = " Its parse result was reused instead of running OCR." if file_data.get('ocr_reused') else ""
+            st.warning(f"This page looks like a duplicate of {duplicate_of}.{reused_note}")
         col1, col2, col3 = st.columns(3)
         col1.metric("Total Elements", len(current_elements))
         
@@ -123,14 +336,24 @@ def main():
         col3.metric("Characters", total_chars)
         
         # Show edit status
-        if edit_tracking['edited_indices']:
-            st.info(f"✏️ {len(edit_tracking['edited_indices'])} element(s) edited")
+        if edit_tracking['edited']:
+            st.info(f"✏️ {len(edit_tracking['edited'])} element(s) edited")
         
         st.markdown("---")
         
+        # Per-element rows are built once and updated as elements are edited
+        summaries = get_element_summaries(edit_tracking, current_elements)
+        type_filter = st.multiselect(
+            "Filter by element type",
+            options=sorted(element_types.keys()),
+            default=[],
+            placeholder="All types"
+        )
+        filtered_indices = filter_element_indices(summaries, type_filter)
+        
         # Create visualization using current (edited) elements with selected color scheme
         with st.spinner("Creating visualization..."):
-            annotated_img, formatted_text = create_side_by_side_view(
+            annotated_img = draw_bounding_boxes(
                 file_data['filepath'],
                 current_elements,
                 box_width=7,
@@ -148,9 +371,11 @@ def main():
         
         with col_text:
             st.subheader("📝 Extracted Text")
+            text_page = select_page("Text page", "text_page", len(filtered_indices), page_size)
+            page_indices, _ = paginate(filtered_indices, text_page, page_size)
             st.text_area(
                 "Extracted content",
-                value=formatted_text,
+                value=format_elements_text(current_elements, show_numbers, page_indices),
                 height=600,
                 label_visibility="collapsed"
             )
@@ -160,19 +385,17 @@ def main():
         with st.expander("Edit Elements", expanded=False):
             st.markdown("### Edit Element Types or Re-parse Regions")
             
-            # Create dataframe for editing
-            edit_data = []
-            for idx, elem in enumerate(current_elements):
-                edit_data.append({
-                    'Number': idx + 1,
-                    'Type': elem['type'],
-                    'Text Preview': elem['text'][:100] + '...' if len(elem['text']) > 100 else elem['text'],
-                    'Has Coordinates': elem['coordinates'] is not None,
-                    'Edited': idx in edit_tracking['edited_indices']
-                })
+            # Only the rows of the current page are turned into a dataframe
+            table_page = select_page("Table page", "table_page", len(filtered_indices), page_size)
+            table_indices, _ = paginate(filtered_indices, table_page, page_size)
             
-            df = pd.DataFrame(edit_data)
-            st.dataframe(df, use_container_width=True, height=300)
+            # pandas is only needed here, so keep it out of startup
+            import pandas as pd
+            df = pd.DataFrame(
+                [summaries[idx] for idx in table_indices],
+                columns=['Number', 'Type', 'Text Preview', 'Has Coordinates', 'Edited']
+            )
+            st.dataframe(df, use_container_width=True, height=300, hide_index=True)
             
             col_edit1, col_edit2 = st.columns(2)
             
@@ -194,12 +417,9 @@ def main():
                 
                 if st.button("Update Type", key="update_type_btn"):
                     idx = element_to_edit - 1
-                    edit_tracking['current'] = update_element_type(
-                        edit_tracking['current'],
-                        idx,
-                        new_type
-                    )
-                    edit_tracking['edited_indices'].add(idx)
+                    update_element_type(current_elements, idx, new_type)
+                    mark_element_edited(edit_tracking, idx, current_elements[idx])
+                    log_relabel(file_data['result_key'], idx, new_type)
                     st.success(f"✓ Updated element {element_to_edit} type to {new_type}")
                     st.rerun()
             
@@ -280,32 +500,75 @@ def main():
                         top_adjust != 0 or bottom_adjust != 0):
                         st.success(f"New box size: {new_width}x{new_height}px")
                         
-                        st.markdown("**Preview:**")
-                        st.caption("Original box in red | Adjusted box in green")
-                        
-                        preview_img = draw_box_comparison(
-                            file_data['filepath'],
-                            elem['coordinates'],
+                        # Fast OCR-only read of the adjusted box in the background
+                        if 'preview_scheduler' not in st.session_state:
+                            st.session_state['preview_scheduler'] = PreviewScheduler()
+                        region_cache = get_region_cache()
+                        region_parser = get_region_parser(use_worker)
+                        preview_key = region_cache.make_key(
+                            file_data['content_hash'],
                             adjusted_coords,
-                            box_width=7
+                            'ocr_only'
+                        )
+                        st.session_state['preview_scheduler'].request(
+                            preview_key,
+                            partial(
+                                region_cache.get_or_parse,
+                                file_data['filepath'],
+                                file_data['content_hash'],
+                                adjusted_coords,
+                                region_parser,
+                                profile='ocr_only'
+                            )
                         )
-                        st.image(preview_img, use_container_width=True)
+                        
+                        col_preview_img, col_preview_text = st.columns([3, 2])
+                        
+                        with col_preview_img:
+                            st.markdown("**Preview:**")
+                            preview_area = st.radio(
+                                "Preview area",
+                                options=["Around box", "Full page"],
+                                horizontal=True,
+                                key="preview_area",
+                                label_visibility="collapsed"
+                            )
+                            st.caption("Original box in red | Adjusted box in green")
+                            
+                            if preview_area == "Around box":
+                                preview_img = draw_box_comparison_crop(
+                                    file_data['filepath'],
+                                    elem['coordinates'],
+                                    adjusted_coords
+                                )
+                            else:
+                                preview_img = draw_box_comparison(
+                                    file_data['filepath'],
+                                    elem['coordinates'],
+                                    adjusted_coords,
+                                    box_width=7
+                                )
+                            st.image(preview_img, use_container_width=True)
+                        
+                        with col_preview_text:
+                            show_live_preview(preview_key)
+                    elif 'preview_scheduler' in st.session_state:
+                        st.session_state['preview_scheduler'].cancel()
                     
                     if st.button("Re-parse with Adjusted Region", key="reparse_btn"):
                         with st.spinner("Re-parsing region..."):
                             try:
-                                new_text = parse_region(
+                                new_text = get_region_cache().get_or_parse(
                                     file_data['filepath'],
-                                    adjusted_coords
-                                )
-                                edit_tracking['current'] = replace_element_with_reparsed(
-                                    edit_tracking['current'],
-                                    idx,
-                                    new_text
+                                    file_data['content_hash'],
+                                    adjusted_coords,
+                                    get_region_parser(use_worker)
                                 )
+                                replace_element_with_reparsed(current_elements, idx, new_text)
                                 # Also update coordinates to the adjusted ones
-                                edit_tracking['current'][idx]['coordinates'] = adjusted_coords
-                                edit_tracking['edited_indices'].add(idx)
+                                current_elements[idx]['coordinates'] = adjusted_coords
+                                mark_element_edited(edit_tracking, idx, current_elements[idx])
+                                log_reparse(file_data['result_key'], idx, new_text, adjusted_coords)
                                 st.success(f"Re-parsed element {element_to_reparse}")
                                 st.rerun()
                             except Exception as e:
@@ -318,14 +581,15 @@ def main():
             col_summary1, col_summary2 = st.columns(2)
             
             with col_summary1:
-                if edit_tracking['edited_indices']:
+                if edit_tracking['edited']:
                     st.markdown("#### Edit Summary")
-                    summary = get_edit_summary(edit_tracking)
+                    summary = get_edit_summary(edit_tracking, file_data['elements'])
                     st.text(summary)
             
             with col_summary2:
                 if st.button("Reset All Edits", type="secondary"):
-                    st.session_state['edit_tracking'][selected_file] = initialize_edit_tracking(file_data)
+                    log_reset(file_data['result_key'])
+                    st.session_state['edit_tracking'][selected_file] = restore_edit_tracking(file_data)
                     st.success("✓ All edits reset")
                     st.rerun()
         
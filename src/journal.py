@@ -0,0 +1,170 @@
+import os
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional, Sequence, Mapping
+
+from utils import (
+    update_element_type,
+    replace_element_with_reparsed,
+    initialize_edit_tracking,
+    get_current_elements
+)
+
+JOURNAL_DIR = "output/edit_journal"
+
+
+def get_journal_path(document_key: str, journal_dir: str = JOURNAL_DIR) -> Path:
+    """
+    Get the journal file for a document.
+
+    Args:
+        document_key: Result key of the parsed document (see parser.get_result_key)
+        journal_dir: Folder holding the edit journals
+
+    Returns:
+        Path to the document's journal file
+    """
+    return Path(journal_dir) / f"{document_key}.jsonl"
+
+
+def append_journal_entry(
+    document_key: str,
+    entry: Dict[str, Any],
+    journal_dir: str = JOURNAL_DIR
+) -> None:
+    """
+    Append one edit to a document's journal and flush it to disk.
+
+    Args:
+        document_key: Result key of the parsed document (see parser.get_result_key)
+        entry: Edit record with an 'op' key ('relabel', 'reparse' or 'reset')
+        journal_dir: Folder holding the edit journals
+    """
+    Path(journal_dir).mkdir(parents=True, exist_ok=True)
+
+    record = dict(entry, timestamp=time.time())
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+
+    with open(get_journal_path(document_key, journal_dir), 'ab+') as f:
+        # Terminate a partial line left by a crash so this entry stays readable
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                line = '\n' + line
+        f.write(line.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def log_relabel(document_key: str, index: int, new_type: str, journal_dir: str = JOURNAL_DIR) -> None:
+    """Record an element type change."""
+    append_journal_entry(document_key, {'op': 'relabel', 'index': index, 'type': new_type}, journal_dir)
+
+
+def log_reparse(
+    document_key: str,
+    index: int,
+    new_text: str,
+    coordinates: Optional[List[Tuple[float, float]]],
+    journal_dir: str = JOURNAL_DIR
+) -> None:
+    """Record a re-parsed element with its new text and coordinates."""
+    append_journal_entry(
+        document_key,
+        {'op': 'reparse', 'index': index, 'text': new_text, 'coordinates': coordinates},
+        journal_dir
+    )
+
+
+def log_reset(document_key: str, journal_dir: str = JOURNAL_DIR) -> None:
+    """Record that all edits of a document were discarded."""
+    append_journal_entry(document_key, {'op': 'reset'}, journal_dir)
+
+
+def load_journal(document_key: str, journal_dir: str = JOURNAL_DIR) -> List[Dict[str, Any]]:
+    """
+    Read all edits recorded for a document.
+
+    Args:
+        document_key: Result key of the parsed document (see parser.get_result_key)
+        journal_dir: Folder holding the edit journals
+
+    Returns:
+        List of edit records in the order they were made
+    """
+    path = get_journal_path(document_key, journal_dir)
+    if not path.exists():
+        return []
+
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a partial last line
+                continue
+
+    return entries
+
+
+def replay_journal(
+    edit_tracking: Dict[str, Any],
+    entries: List[Dict[str, Any]],
+    elements: Sequence[Mapping[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Apply recorded edits to freshly initialized edit tracking.
+
+    Args:
+        edit_tracking: Edit tracking dictionary from initialize_edit_tracking
+        entries: Edit records from load_journal
+        elements: Elements of the parse result the edits were made on
+
+    Returns:
+        Updated edit tracking dictionary
+    """
+    # Everything before the last reset was discarded by the reviewer
+    start = 0
+    for pos, entry in enumerate(entries):
+        if entry.get('op') == 'reset':
+            start = pos + 1
+
+    current = get_current_elements(edit_tracking, elements)
+
+    for entry in entries[start:]:
+        op = entry.get('op')
+        idx = entry.get('index')
+
+        if op not in ('relabel', 'reparse') or not isinstance(idx, int) or not 0 <= idx < len(current):
+            continue
+
+        if op == 'relabel':
+            current = update_element_type(current, idx, entry['type'])
+        else:
+            current = replace_element_with_reparsed(current, idx, entry['text'])
+            coords = entry.get('coordinates')
+            current[idx]['coordinates'] = [tuple(p) for p in coords] if coords else None
+
+        edit_tracking['edited'][idx] = current[idx]
+
+    return edit_tracking
+
+
+def restore_edit_tracking(
+    file_data: Mapping[str, Any],
+    journal_dir: str = JOURNAL_DIR
+) -> Dict[str, Any]:
+    """
+    Initialize edit tracking for a file and restore its journaled edits.
+
+    Args:
+        file_data: Parsed file data (must include 'result_key')
+        journal_dir: Folder holding the edit journals
+
+    Returns:
+        Edit tracking dictionary with all recorded edits applied
+    """
+    entries = load_journal(file_data['result_key'], journal_dir)
+    return replay_journal(initialize_edit_tracking(), entries, file_data['elements'])
@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+DEFAULT_DEBOUNCE = 0.4
+DEFAULT_IDLE_TIMEOUT = 60.0
+
+
+class PreviewScheduler:
+    """
+    Run preview jobs in the background, keeping only the latest request.
+
+    A request waits until no newer request has arrived for the debounce
+    interval before it starts. Requests replaced while waiting are dropped
+    without running, and results of requests replaced while running are
+    discarded, so only the preview of the most recent box is ever shown.
+    The background thread exits when idle and is restarted on demand.
+    """
+
+    def __init__(
+        self,
+        debounce: float = DEFAULT_DEBOUNCE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_results: int = 32
+    ):
+        self.debounce = debounce
+        self.idle_timeout = idle_timeout
+        self.max_results = max_results
+        self._cond = threading.Condition()
+        self._pending = None
+        self._requested_at = 0.0
+        self._generation = 0
+        self._running_key = None
+        self._running_generation = None
+        self._results = OrderedDict()
+        self._thread = None
+
+    def request(self, key: str, job: Callable[[], str]) -> None:
+        """
+        Ask for the preview of a key, replacing any earlier request.
+
+        Args:
+            key: Identifies the preview (e.g. a region cache key)
+            job: Function producing the preview text
+        """
+        with self._cond:
+            if key in self._results:
+                return
+            if key == self._running_key:
+                # Back to the box being read (e.g. nudged away and back): keep
+                # its result and drop the request made in between
+                self._generation += 1
+                self._running_generation = self._generation
+                self._pending = None
+                return
+            if self._pending is not None and self._pending[0] == key:
+                return
+
+            self._generation += 1
+            self._pending = (key, job)
+            self._requested_at = time.monotonic()
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='preview-scheduler', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self) -> None:
+        """Drop the pending request and discard the one currently running."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def result(self, key: str) -> Tuple[str, Optional[str]]:
+        """
+        Get the state of a preview.
+
+        Args:
+            key: Preview key passed to request
+
+        Returns:
+            Tuple of (status, text) where status is 'ready', 'error',
+            'running', 'pending' or 'missing'
+        """
+        with self._cond:
+            if key in self._results:
+                return self._results[key]
+            if key == self._running_key:
+                return 'running', None
+            if self._pending is not None and self._pending[0] == key:
+                return 'pending', None
+            return 'missing', None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                # Wait for work, exiting after a while without any
+                if self._pending is None:
+                    self._cond.wait(self.idle_timeout)
+                    if self._pending is None:
+                        self._thread = None
+                        return
+                    continue
+
+                # Debounce: start only once requests have stopped arriving
+                remaining = self._requested_at + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+
+                key, job = self._pending
+                self._pending = None
+                self._running_key = key
+                self._running_generation = self._generation
+
+            try:
+                outcome = ('ready', job())
+            except Exception as e:
+                outcome = ('error', str(e))
+
+            with self._cond:
+                self._running_key = None
+                if self._running_generation == self._generation:
+                    self._results[key] = outcome
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
@@ -0,0 +1,308 @@
+import os
+import sys
+import stat
+import time
+import secrets
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+sys.path.append(str(Path(__file__).parent))
+
+SOCKET_NAME = 'ocr.sock'
+AUTHKEY_NAME = 'authkey'
+AUTHKEY_ENV = 'DOCUMENT_PARSER_OCR_AUTHKEY'
+
+
+def get_runtime_dir() -> str:
+    """
+    Get the private folder holding the worker's socket and key.
+
+    The folder is per user and only accessible by its owner, so other users
+    on a shared host can neither bind the socket first nor read the key.
+
+    Returns:
+        Path of the folder
+
+    Raises:
+        RuntimeError: If the folder exists but is not private to the current user
+    """
+    base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    runtime_dir = os.path.join(base, f'document_parser_{os.getuid()}')
+
+    try:
+        os.mkdir(runtime_dir, 0o700)
+    except FileExistsError:
+        pass
+
+    info = os.lstat(runtime_dir)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{runtime_dir} is not a private folder of the current user")
+
+    return runtime_dir
+
+
+def get_default_socket_path() -> str:
+    """Path of the worker's Unix socket in the private runtime folder."""
+    return os.path.join(get_runtime_dir(), SOCKET_NAME)
+
+
+def load_authkey() -> bytes:
+    """
+    Get the key clients must present to the worker.
+
+    The key is taken from the DOCUMENT_PARSER_OCR_AUTHKEY environment variable
+    if set, otherwise from a key file readable only by the owner, which is
+    generated on first use.
+
+    Returns:
+        Authentication key
+    """
+    env_key = os.environ.get(AUTHKEY_ENV)
+    if env_key:
+        return env_key.encode()
+
+    key_path = os.path.join(get_runtime_dir(), AUTHKEY_NAME)
+    try:
+        fd = os.open(key_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        with open(key_path, 'rb') as f:
+            return f.read().strip()
+
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def _warm_up() -> None:
+    """
+    Load the layout model, table model and OCR bindings before the first real job.
+
+    A small page is run through the parser for the layout model and OCR. The
+    table model is only loaded once a table is detected, which the warm-up
+    page has none of, so it is loaded explicitly.
+    """
+    from PIL import Image, ImageDraw
+    from parser import parse_single_tiff
+
+    img = Image.new('RGB', (400, 120), 'white')
+    ImageDraw.Draw(img).text((20, 40), "Warm up", fill='black')
+
+    with tempfile.NamedTemporaryFile(suffix='.tiff', delete=False) as tmp:
+        img.save(tmp.name)
+        tmp_path = tmp.name
+
+    try:
+        parse_single_tiff(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+
+    try:
+        from unstructured_inference.models.tables import load_agent
+        load_agent()
+    except Exception as e:
+        print(f"Could not preload the table model: {e}")
+
+
+def _run_job(job: str, kwargs: Dict[str, Any]) -> Any:
+    """
+    Dispatch a single job to the parser.
+
+    Args:
+        job: Job type ('page', 'region' or 'ping')
+        kwargs: Keyword arguments for the parser function
+
+    Returns:
+        Result of the parser function
+    """
+    if job == 'ping':
+        return 'pong'
+
+    from parser import parse_single_tiff, parse_region
+
+    if job == 'page':
+        return parse_single_tiff(**kwargs)
+    if job == 'region':
+        return parse_region(**kwargs)
+    raise ValueError(f"Unknown job type: {job}")
+
+
+def _serve_connection(conn, job_lock: threading.Lock) -> None:
+    """Answer jobs from one client until it disconnects."""
+    with conn:
+        while True:
+            try:
+                job, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                # Models are shared, so jobs from all clients run one at a time
+                with job_lock:
+                    result = _run_job(job, kwargs)
+                reply = ('ok', result)
+            except Exception as e:
+                reply = ('error', f"{type(e).__name__}: {e}")
+
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+
+
+def serve(
+    address: Optional[str] = None,
+    authkey: Optional[bytes] = None,
+    warm: bool = True
+) -> None:
+    """
+    Run the OCR worker service until the process is stopped.
+
+    Args:
+        address: Path of the Unix socket to listen on (defaults to the private runtime folder)
+        authkey: Shared key clients must present to connect (defaults to load_authkey())
+        warm: Whether to load the models before accepting jobs
+    """
+    address = address or get_default_socket_path()
+    authkey = authkey or load_authkey()
+
+    if os.path.exists(address):
+        if OCRWorkerClient(address, authkey).ping():
+            raise RuntimeError(f"An OCR worker is already listening on {address}")
+        # Left behind by a worker that did not shut down cleanly
+        os.unlink(address)
+
+    if warm:
+        _warm_up()
+
+    job_lock = threading.Lock()
+
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        print(f"OCR worker listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"Rejected connection: {e}")
+                continue
+            threading.Thread(
+                target=_serve_connection,
+                args=(conn, job_lock),
+                daemon=True
+            ).start()
+
+
+class OCRWorkerClient:
+    """
+    Client for a running OCR worker service.
+
+    Mirrors parse_single_tiff and parse_region so it can be passed wherever
+    those functions are used. The connection is opened on first use and
+    shared between threads.
+    """
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.address = address or get_default_socket_path()
+        self.authkey = authkey or load_authkey()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _request(self, job: str, **kwargs) -> Any:
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            try:
+                self._conn.send((job, kwargs))
+                status, result = self._conn.recv()
+            except (EOFError, OSError):
+                self._conn = None
+                raise
+
+        if status == 'error':
+            raise RuntimeError(f"OCR worker error: {result}")
+        return result
+
+    def ping(self) -> bool:
+        """
+        Check whether the worker is reachable.
+
+        Returns:
+            True if the worker answered
+        """
+        try:
+            return self._request('ping') == 'pong'
+        except (EOFError, OSError):
+            return False
+
+    def parse_single_tiff(self, file_path: str, **options) -> Dict[str, Any]:
+        """Parse a full page in the worker (see parser.parse_single_tiff)."""
+        return self._request('page', file_path=file_path, **options)
+
+    def parse_region(self, image_path: str, coordinates: List[tuple], **options) -> str:
+        """Parse a region in the worker (see parser.parse_region)."""
+        return self._request('region', image_path=image_path, coordinates=coordinates, **options)
+
+    def close(self) -> None:
+        """Close the connection to the worker."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def start_worker(
+    address: Optional[str] = None,
+    authkey: Optional[bytes] = None,
+    timeout: float = 300.0
+) -> OCRWorkerClient:
+    """
+    Connect to the OCR worker, starting one in the background if none is running.
+
+    Args:
+        address: Path of the worker's Unix socket (defaults to the private runtime folder)
+        authkey: Shared key for the connection (defaults to load_authkey())
+        timeout: Seconds to wait for a new worker to finish warming up
+
+    Returns:
+        Connected OCRWorkerClient
+    """
+    client = OCRWorkerClient(address, authkey)
+    address, authkey = client.address, client.authkey
+    if client.ping():
+        return client
+
+    # Spawn rather than fork so the worker does not inherit the caller's threads
+    ctx = multiprocessing.get_context('spawn')
+    process = ctx.Process(
+        target=serve,
+        args=(address, authkey),
+        name='ocr-worker',
+        daemon=True
+    )
+    process.start()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"OCR worker exited with code {process.exitcode}")
+        if os.path.exists(address) and client.ping():
+            return client
+        time.sleep(0.5)
+
+    process.terminate()
+    raise TimeoutError(f"OCR worker did not start within {timeout:.0f}s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Run the warm OCR worker service")
+    arg_parser.add_argument("--socket", help="Unix socket path (defaults to a private per-user folder)")
+    arg_parser.add_argument("--no-warm", action="store_true", help="Skip loading models at startup")
+    args = arg_parser.parse_args()
+
+    serve(args.socket, warm=not args.no_warm)
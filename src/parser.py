@@ -1,7 +1,59 @@
 import os
+import json
+import threading
 from pathlib import Path
-from typing import List, Dict, Any
-from unstructured.partition.image import partition_image
+from typing import List, Dict, Any, Callable, Optional
+
+from utils import compute_file_hash
+from preprocessing import load_preprocessed, map_points_to_original, get_options_key, PREPROCESSED_CACHE_DIR
+from dedup import (
+    find_duplicate_pages,
+    can_reuse_result,
+    rescale_elements,
+    DEFAULT_MAX_DISTANCE,
+    DEFAULT_MIN_SIMILARITY
+)
+from tiff_roi import read_tiff_region
+
+RESULTS_CACHE_DIR = "output/parse_cache"
+
+# Defaults of the parse_single_tiff options, left out of result keys
+DEFAULT_PARSE_OPTIONS = {
+    'preprocess': None,
+    'strategy': 'hi_res',
+    'infer_table_structure': True
+}
+
+
+def partition_image(**kwargs):
+    """
+    Run unstructured's partition_image, importing the layout/OCR stack on first use.
+    
+    Importing unstructured loads the layout, OCR and table libraries, so it is
+    deferred until OCR is actually needed. This keeps the UI fast to start when
+    only saved results are viewed.
+    """
+    from unstructured.partition.image import partition_image as _partition_image
+    
+    return _partition_image(**kwargs)
+
+
+def warm_parsing_stack() -> threading.Thread:
+    """
+    Import the parsing stack in a background thread.
+    
+    Returns:
+        The started thread
+    """
+    def _import():
+        try:
+            import unstructured.partition.image  # noqa: F401
+        except Exception as e:
+            print(f"Could not load parsing stack: {e}")
+    
+    thread = threading.Thread(target=_import, name='warm-parsing-stack', daemon=True)
+    thread.start()
+    return thread
 
 
 def scan_data_folder(folder_path: str) -> List[str]:
@@ -27,12 +79,59 @@ def scan_data_folder(folder_path: str) -> List[str]:
     return [str(f) for f in sorted(tiff_files)]
 
 
-def parse_single_tiff(file_path: str) -> Dict[str, Any]:
+def get_result_key(content_hash: str, parse_options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get the key identifying a parse of some content with some options.
+    
+    Args:
+        content_hash: SHA-256 of the file content
+        parse_options: Options passed to parse_single_tiff (None or empty for defaults)
+        
+    Returns:
+        The content hash for default options, otherwise the hash with an options suffix
+    """
+    options = {
+        k: v for k, v in (parse_options or {}).items()
+        if v is not None and v != DEFAULT_PARSE_OPTIONS.get(k)
+    }
+    if not options:
+        return content_hash
+    return f"{content_hash}_{get_options_key(options)}"
+
+
+def get_reused_result_key(result_key: str) -> str:
+    """
+    Get the key under which a result copied from a duplicate's original is saved.
+    
+    Copied results are kept apart from OCR results of the same file, so they
+    are never returned once duplicate reuse is turned off.
+    
+    Args:
+        result_key: Key of an OCR parse of the file (from get_result_key)
+        
+    Returns:
+        Key of the copied result
+    """
+    return f"{result_key}_reused"
+
+
+def parse_single_tiff(
+    file_path: str,
+    preprocess: Optional[Dict[str, Any]] = None,
+    strategy: str = 'hi_res',
+    infer_table_structure: bool = True,
+    preprocess_cache_dir: str = PREPROCESSED_CACHE_DIR
+) -> Dict[str, Any]:
     """
     Parse a single TIFF file and extract text with coordinates.
     
     Args:
         file_path: Path to the TIFF file
+        preprocess: Preprocessing options (see preprocessing.DEFAULT_PREPROCESS_OPTIONS),
+            or None to OCR the raw scan
+        strategy: Unstructured partitioning strategy ('hi_res', 'ocr_only' or 'auto')
+        infer_table_structure: Whether to extract the structure of detected tables
+        preprocess_cache_dir: Folder where preprocessed rasters are cached
         
     Returns:
         Dictionary containing:
@@ -40,10 +139,21 @@ def parse_single_tiff(file_path: str) -> Dict[str, Any]:
             - filepath: Full path to the file
             - elements: List of extracted elements with text and coordinates
             - full_text: All extracted text concatenated
+            - content_hash: SHA-256 of the file content
+            - result_key: Key of this parse (content hash plus options)
     """
+    content_hash = compute_file_hash(file_path)
+    
+    # OCR the preprocessed raster and map its coordinates back afterwards
+    transform = None
+    ocr_path = file_path
+    if preprocess:
+        ocr_path, transform = load_preprocessed(file_path, content_hash, preprocess, preprocess_cache_dir)
+    
     elements = partition_image(
-        filename=file_path,
-        infer_table_structure=True
+        filename=ocr_path,
+        strategy=strategy,
+        infer_table_structure=infer_table_structure
     )
     
     # Structure the results
@@ -61,6 +171,8 @@ def parse_single_tiff(file_path: str) -> Dict[str, Any]:
         if hasattr(element, 'metadata') and element.metadata.coordinates:
             points = element.metadata.coordinates.points
             element_data['coordinates'] = [(p[0], p[1]) for p in points]
+            if transform is not None:
+                element_data['coordinates'] = map_points_to_original(element_data['coordinates'], transform)
         
         parsed_elements.append(element_data)
         full_text_parts.append(str(element))
@@ -69,16 +181,131 @@ def parse_single_tiff(file_path: str) -> Dict[str, Any]:
         'filename': Path(file_path).name,
         'filepath': file_path,
         'elements': parsed_elements,
-        'full_text': '\n\n'.join(full_text_parts)
+        'full_text': '\n\n'.join(full_text_parts),
+        'content_hash': content_hash,
+        'result_key': get_result_key(content_hash, {
+            'preprocess': preprocess,
+            'strategy': strategy,
+            'infer_table_structure': infer_table_structure
+        })
     }
 
 
-def parse_all_tiffs(folder_path: str) -> Dict[str, Dict[str, Any]]:
+def load_cached_result(
+    file_path: str,
+    result_key: str,
+    cache_dir: str = RESULTS_CACHE_DIR
+) -> Optional[Dict[str, Any]]:
+    """
+    Load a previously saved parse result for a file's content.
+    
+    Args:
+        file_path: Path to the TIFF file the result is for
+        result_key: Key from get_result_key for the content and parse options
+        cache_dir: Folder holding saved parse results
+        
+    Returns:
+        Parse result, or None if the content has not been parsed before
+    """
+    cache_path = Path(cache_dir) / f"{result_key}.json"
+    if not cache_path.exists():
+        return None
+    
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    
+    # JSON has no tuples; restore the coordinate format used by the parser
+    for element in result['elements']:
+        if element['coordinates'] is not None:
+            element['coordinates'] = [tuple(p) for p in element['coordinates']]
+    
+    # The same content may live under a different name or folder
+    result['filename'] = Path(file_path).name
+    result['filepath'] = file_path
+    return result
+
+
+def save_cached_result(result: Dict[str, Any], cache_dir: str = RESULTS_CACHE_DIR) -> str:
+    """
+    Save a parse result so it can be reloaded without running OCR again.
+    
+    Args:
+        result: Parse result from parse_single_tiff
+        cache_dir: Folder holding saved parse results
+        
+    Returns:
+        Path to the saved result
+    """
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    cache_path = Path(cache_dir) / f"{result['result_key']}.json"
+    
+    # Write to a temporary file first so readers never see a partial result
+    tmp_path = cache_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    
+    return str(cache_path)
+
+
+def reuse_duplicate_result(
+    source_result: Dict[str, Any],
+    file_path: str,
+    parse_options: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build the parse result of a duplicate page from the result of its original.
+    
+    Args:
+        source_result: Parse result of the original page
+        file_path: Path to the duplicate page
+        parse_options: Options the original was parsed with
+        
+    Returns:
+        Parse result for the duplicate, with coordinates rescaled to its size
+    """
+    from PIL import Image
+    
+    with Image.open(source_result['filepath']) as source_img, Image.open(file_path) as target_img:
+        source_size, target_size = source_img.size, target_img.size
+    
+    content_hash = compute_file_hash(file_path)
+    
+    return {
+        'filename': Path(file_path).name,
+        'filepath': file_path,
+        'elements': rescale_elements(source_result['elements'], source_size, target_size),
+        'full_text': source_result['full_text'],
+        'content_hash': content_hash,
+        'result_key': get_reused_result_key(get_result_key(content_hash, parse_options)),
+        'ocr_reused': True
+    }
+
+
+def parse_all_tiffs(
+    folder_path: str,
+    parse_fn: Optional[Callable[[str], Dict[str, Any]]] = None,
+    cache_dir: Optional[str] = None,
+    detect_duplicates: bool = False,
+    reuse_duplicates: bool = False,
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    **parse_options
+) -> Dict[str, Dict[str, Any]]:
     """
     Parse all TIFF files in the specified folder.
     
     Args:
         folder_path: Path to the folder containing TIFF files
+        parse_fn: Function used to parse each file (defaults to parse_single_tiff,
+            pass a worker client's parse_single_tiff to use the warm OCR worker)
+        cache_dir: Folder of saved parse results to reuse and extend (no caching if None)
+        detect_duplicates: Mark near-duplicate pages with 'duplicate_of'
+        reuse_duplicates: Copy the original's result to duplicates instead of running OCR,
+            for duplicates that also pass dedup.can_reuse_result
+        max_distance: Largest perceptual hash distance (in bits) for a duplicate candidate
+        min_similarity: Smallest thumbnail similarity confirming a candidate as a duplicate
+        **parse_options: Options passed on to parse_fn (e.g. preprocess, strategy)
         
     Returns:
         Dictionary mapping filenames to their parse results
@@ -89,12 +316,50 @@ def parse_all_tiffs(folder_path: str) -> Dict[str, Dict[str, Any]]:
         print(f"No TIFF files found in {folder_path}")
         return {}
     
+    if parse_fn is None:
+        parse_fn = parse_single_tiff
+    
     results = {}
     
+    duplicates = {}
+    if detect_duplicates or reuse_duplicates:
+        duplicates = find_duplicate_pages(tiff_files, max_distance, min_similarity)
+    
     for file_path in tiff_files:
-        print(f"Parsing: {Path(file_path).name}")
+        original = duplicates.get(file_path)
+        original_name = Path(original).name if original else None
         try:
-            parsed_data = parse_single_tiff(file_path)
+            # Duplicates may only share a template, so the result is copied only after a strict check
+            reusable = False
+            if reuse_duplicates and original_name:
+                reusable = can_reuse_result(original, file_path)
+                if not reusable:
+                    print(f"Not reusing {original_name}, content may differ: {Path(file_path).name}")
+            
+            parsed_data = None
+            if cache_dir:
+                result_key = get_result_key(compute_file_hash(file_path), parse_options)
+                parsed_data = load_cached_result(file_path, result_key, cache_dir)
+                # Copied results saved under the OCR key by older versions are not OCR results
+                if parsed_data is not None and parsed_data.get('ocr_reused'):
+                    parsed_data = None
+                if parsed_data is None and reusable:
+                    parsed_data = load_cached_result(file_path, get_reused_result_key(result_key), cache_dir)
+            
+            if parsed_data is None and reusable and original_name in results:
+                print(f"Reusing {original_name} for duplicate: {Path(file_path).name}")
+                parsed_data = reuse_duplicate_result(results[original_name], file_path, parse_options)
+                if cache_dir:
+                    save_cached_result(parsed_data, cache_dir)
+            
+            if parsed_data is None:
+                print(f"Parsing: {Path(file_path).name}")
+                parsed_data = parse_fn(file_path, **parse_options)
+                if cache_dir:
+                    save_cached_result(parsed_data, cache_dir)
+            
+            if original_name:
+                parsed_data['duplicate_of'] = original_name
             results[parsed_data['filename']] = parsed_data
         except Exception as e:
             print(f"Error parsing {file_path}: {e}")
@@ -103,30 +368,27 @@ def parse_all_tiffs(folder_path: str) -> Dict[str, Dict[str, Any]]:
     return results
 
 
-def parse_region(image_path: str, coordinates: List[tuple]) -> str:
+def parse_region(image_path: str, coordinates: List[tuple], strategy: str = 'hi_res') -> str:
     """
     Parse a specific region of an image marked by the user.
     
     Args:
         image_path: Path to the image file
         coordinates: List of (x, y) tuples defining the region boundary
+        strategy: Unstructured partitioning strategy ('hi_res', 'ocr_only' or 'auto')
         
     Returns:
         Extracted text from the specified region
     """
-    from PIL import Image
     import tempfile
     
-    # Load image
-    img = Image.open(image_path)
-    
     # Get bounding box from coordinates
     xs = [coord[0] for coord in coordinates]
     ys = [coord[1] for coord in coordinates]
     bbox = (min(xs), min(ys), max(xs), max(ys))
     
-    # Crop to the specified region
-    cropped = img.crop(bbox)
+    # Read only the specified region
+    cropped = read_tiff_region(image_path, bbox)
     
     # Save temporarily and parse
     with tempfile.NamedTemporaryFile(suffix='.tiff', delete=False) as tmp:
@@ -134,7 +396,7 @@ def parse_region(image_path: str, coordinates: List[tuple]) -> str:
         tmp_path = tmp.name
     
     try:
-        elements = partition_image(filename=tmp_path)
+        elements = partition_image(filename=tmp_path, strategy=strategy)
         text = '\n'.join([str(el) for el in elements])
     finally:
         os.unlink(tmp_path)
@@ -0,0 +1,289 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+import numpy as np
+from PIL import Image
+
+PREPROCESSED_CACHE_DIR = "output/preprocessed"
+
+DEFAULT_PREPROCESS_OPTIONS = {
+    'target_dpi': 300,
+    'deskew': True,
+    'binarize': True,
+    'crop_borders': True
+}
+
+
+def normalize_resolution(img: Image.Image, target_dpi: Optional[int]) -> Tuple[Image.Image, float]:
+    """
+    Downscale an image whose resolution is above the target DPI.
+
+    Args:
+        img: PIL Image (its 'dpi' info is used to determine the resolution)
+        target_dpi: Resolution to downscale to (None to keep the original)
+
+    Returns:
+        Tuple of (image, scale factor applied)
+    """
+    dpi = img.info.get('dpi')
+    if not target_dpi or not dpi or not dpi[0]:
+        return img, 1.0
+
+    scale = float(target_dpi) / float(dpi[0])
+    if scale >= 1.0:
+        return img, 1.0
+
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(new_size, Image.BOX), scale
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """
+    Compute the Otsu threshold of a grayscale image.
+
+    Args:
+        gray: 2D uint8 array
+
+    Returns:
+        Threshold separating dark foreground from light background
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    sum_fg = sum_bg[-1] - sum_bg
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = sum_bg / weight_bg
+        mean_fg = sum_fg / weight_fg
+        between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+
+    return int(np.nanargmax(between_var))
+
+
+def estimate_skew_angle(
+    dark: np.ndarray,
+    max_angle: float = 5.0,
+    step: float = 0.25,
+    max_points: int = 100000
+) -> float:
+    """
+    Estimate the skew of text lines by maximizing the sharpness of the
+    horizontal projection profile over a range of candidate angles.
+
+    Args:
+        dark: 2D boolean array marking ink pixels
+        max_angle: Largest skew to consider, in degrees
+        step: Angle resolution, in degrees
+        max_points: Number of ink pixels sampled for the estimate
+
+    Returns:
+        Angle in degrees to rotate the image by (counterclockwise) to level the text
+    """
+    ys, xs = np.nonzero(dark)
+    if len(ys) == 0:
+        return 0.0
+
+    if len(ys) > max_points:
+        sample = np.random.default_rng(0).choice(len(ys), max_points, replace=False)
+        ys, xs = ys[sample], xs[sample]
+
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    radians = np.deg2rad(angles)[:, None]
+
+    # Row each ink pixel lands on after rotating by each candidate angle
+    rows = np.rint(ys[None, :] * np.cos(radians) - xs[None, :] * np.sin(radians)).astype(np.int64)
+    rows -= rows.min()
+    n_rows = int(rows.max()) + 1
+
+    # One bincount over all angles at once, then score each profile
+    offsets = np.arange(len(angles))[:, None] * n_rows
+    profiles = np.bincount((rows + offsets).ravel(), minlength=len(angles) * n_rows)
+    profiles = profiles.reshape(len(angles), n_rows).astype(np.float64)
+    scores = (profiles ** 2).sum(axis=1)
+
+    return float(angles[np.argmax(scores)])
+
+
+def find_content_box(
+    dark: np.ndarray,
+    border_fraction: float = 0.5,
+    min_fraction: float = 0.001,
+    margin: int = 10
+) -> Tuple[int, int, int, int]:
+    """
+    Find the page content, skipping dark scanner borders and blank margins.
+
+    Args:
+        dark: 2D boolean array marking ink pixels
+        border_fraction: Edge rows/columns darker than this are treated as border
+        min_fraction: Rows/columns with less ink than this are treated as blank
+        margin: Pixels of padding kept around the content
+
+    Returns:
+        Bounding box (left, top, right, bottom) of the content
+    """
+    def border_range(fractions: np.ndarray) -> Tuple[int, int]:
+        # Border lines touching the edges of the scan
+        is_border = fractions >= border_fraction
+        if is_border.all():
+            return 0, len(fractions)
+        return int(np.argmax(~is_border)), len(fractions) - int(np.argmax(~is_border[::-1]))
+
+    def content_range(fractions: np.ndarray) -> Tuple[int, int]:
+        hits = np.nonzero(fractions > min_fraction)[0]
+        if len(hits) == 0:
+            return 0, len(fractions)
+        return (
+            max(0, int(hits[0]) - margin),
+            min(len(fractions), int(hits[-1]) + 1 + margin)
+        )
+
+    top, bottom = border_range(dark.mean(axis=1))
+    left, right = border_range(dark.mean(axis=0))
+
+    # Look for blank margins only inside the borders
+    inner = dark[top:bottom, left:right]
+    inner_top, inner_bottom = content_range(inner.mean(axis=1))
+    inner_left, inner_right = content_range(inner.mean(axis=0))
+
+    return left + inner_left, top + inner_top, left + inner_right, top + inner_bottom
+
+
+def preprocess_image(
+    img: Image.Image,
+    options: Dict[str, Any]
+) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Prepare a scanned page for OCR.
+
+    Args:
+        img: PIL Image of the scanned page
+        options: Preprocessing options (see DEFAULT_PREPROCESS_OPTIONS)
+
+    Returns:
+        Tuple of (preprocessed grayscale image, transform mapping it back to the original)
+    """
+    img, scale = normalize_resolution(img, options.get('target_dpi'))
+    gray_img = img.convert('L')
+    gray = np.asarray(gray_img)
+
+    threshold = otsu_threshold(gray)
+    dark = gray <= threshold
+
+    # Scanner borders are aligned with the raster, so crop before rotating
+    offset = (0, 0)
+    if options.get('crop_borders'):
+        left, top, right, bottom = find_content_box(dark)
+        gray_img = gray_img.crop((left, top, right, bottom))
+        gray = np.asarray(gray_img)
+        dark = gray <= threshold
+        offset = (left, top)
+
+    angle = 0.0
+    center = (gray_img.width / 2, gray_img.height / 2)
+    if options.get('deskew'):
+        angle = estimate_skew_angle(dark)
+        if angle != 0.0:
+            gray_img = gray_img.rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+            gray = np.asarray(gray_img)
+            dark = gray <= threshold
+
+    if options.get('binarize'):
+        gray = np.where(dark, 0, 255).astype(np.uint8)
+
+    transform = {
+        'scale': scale,
+        'angle': angle,
+        'center': center,
+        'offset': offset
+    }
+
+    return Image.fromarray(np.ascontiguousarray(gray)), transform
+
+
+def map_points_to_original(
+    points: List[Tuple[float, float]],
+    transform: Dict[str, Any]
+) -> List[Tuple[float, float]]:
+    """
+    Map coordinates on a preprocessed image back to original pixel space.
+
+    Args:
+        points: List of (x, y) coordinates on the preprocessed image
+        transform: Transform returned by preprocess_image
+
+    Returns:
+        List of (x, y) coordinates on the original image
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    # Undo the counterclockwise rotation about the center of the cropped page
+    cx, cy = transform['center']
+    theta = np.deg2rad(transform['angle'])
+    dx, dy = pts[:, 0] - cx, pts[:, 1] - cy
+    xs = cx + dx * np.cos(theta) - dy * np.sin(theta)
+    ys = cy + dx * np.sin(theta) + dy * np.cos(theta)
+
+    # Undo the border crop, then the downscale
+    xs = xs + transform['offset'][0]
+    ys = ys + transform['offset'][1]
+
+    scale = transform['scale']
+    return [(float(x), float(y)) for x, y in zip(xs / scale, ys / scale)]
+
+
+def get_options_key(options: Dict[str, Any]) -> str:
+    """
+    Get a short stable key identifying a set of options.
+
+    Args:
+        options: JSON-serializable options dictionary
+
+    Returns:
+        Hex key
+    """
+    encoded = json.dumps(options, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def load_preprocessed(
+    file_path: str,
+    content_hash: str,
+    options: Dict[str, Any],
+    cache_dir: str = PREPROCESSED_CACHE_DIR
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Get the preprocessed raster of a page, creating and caching it if needed.
+
+    Args:
+        file_path: Path to the original image
+        content_hash: SHA-256 of the original file content
+        options: Preprocessing options
+        cache_dir: Folder holding preprocessed rasters
+
+    Returns:
+        Tuple of (path to preprocessed image, transform back to the original)
+    """
+    stem = f"{content_hash}_{get_options_key(options)}"
+    image_path = Path(cache_dir) / f"{stem}.png"
+    transform_path = Path(cache_dir) / f"{stem}.json"
+
+    if image_path.exists() and transform_path.exists():
+        with open(transform_path, 'r', encoding='utf-8') as f:
+            return str(image_path), json.load(f)
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    with Image.open(file_path) as img:
+        processed, transform = preprocess_image(img, options)
+
+    processed.save(image_path)
+    with open(transform_path, 'w', encoding='utf-8') as f:
+        json.dump(transform, f)
+
+    return str(image_path), transform
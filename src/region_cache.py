@@ -0,0 +1,157 @@
+import os
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Tuple, Optional, Callable
+
+REGION_CACHE_DIR = "output/region_cache"
+DEFAULT_GRID = 8
+DEFAULT_MAX_ENTRIES = 512
+
+
+def quantize_bbox(coordinates: List[Tuple[float, float]], grid: int = DEFAULT_GRID) -> Tuple[int, int, int, int]:
+    """
+    Snap the bounding box of some coordinates to a pixel grid.
+
+    Args:
+        coordinates: List of (x, y) coordinate tuples
+        grid: Grid size in pixels (boxes whose edges round to the same
+            grid lines share a key)
+
+    Returns:
+        Quantized bounding box (left, top, right, bottom)
+    """
+    xs = [coord[0] for coord in coordinates]
+    ys = [coord[1] for coord in coordinates]
+    grid = max(1, int(grid))
+
+    return tuple(int(math.floor(v / grid + 0.5)) * grid for v in (min(xs), min(ys), max(xs), max(ys)))
+
+
+class RegionCache:
+    """
+    Memoized region OCR results with LRU eviction and an optional disk tier.
+
+    Results are keyed by the image content hash, the bounding box quantized to
+    a pixel grid and the parse profile (strategy), so repeated or nearly
+    identical re-parse requests are answered without running OCR. The cache is
+    safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        grid: int = DEFAULT_GRID,
+        disk_dir: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.grid = grid
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(
+        self,
+        content_hash: str,
+        coordinates: List[Tuple[float, float]],
+        profile: str = 'hi_res'
+    ) -> str:
+        """
+        Build the cache key of a region request.
+
+        Args:
+            content_hash: SHA-256 of the image file content
+            coordinates: Region coordinates
+            profile: Parse profile (strategy passed to parse_region)
+
+        Returns:
+            Cache key
+        """
+        left, top, right, bottom = quantize_bbox(coordinates, self.grid)
+        return f"{content_hash}_{left}_{top}_{right}_{bottom}_{profile}"
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return Path(self.disk_dir) / f"{key}.txt" if self.disk_dir else None
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached region result.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached text, or None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+
+        text = path.read_text(encoding='utf-8')
+        self._remember(key, text)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Store a region result in memory and, if enabled, on disk.
+
+        Args:
+            key: Key from make_key
+            text: Parsed text of the region
+        """
+        self._remember(key, text)
+
+        path = self._disk_path(key)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_parse(
+        self,
+        image_path: str,
+        content_hash: str,
+        coordinates: List[Tuple[float, float]],
+        parse_fn: Callable[..., str],
+        profile: str = 'hi_res'
+    ) -> str:
+        """
+        Return the cached text of a region, running parse_fn on a miss.
+
+        Args:
+            image_path: Path to the image file
+            content_hash: SHA-256 of the image file content
+            coordinates: Region coordinates
+            parse_fn: Region parser, called as parse_fn(image_path, coordinates, strategy=profile)
+            profile: Parse profile (strategy passed to parse_fn)
+
+        Returns:
+            Extracted text of the region
+        """
+        key = self.make_key(content_hash, coordinates, profile)
+
+        text = self.get(key)
+        if text is None:
+            text = parse_fn(image_path, coordinates, strategy=profile)
+            self.put(key, text)
+
+        return text
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the disk tier is kept)."""
+        with self._lock:
+            self._entries.clear()
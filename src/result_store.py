@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Hashable, Mapping, Optional
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Rough per-object overheads used when estimating the size of a result
+_ELEMENT_OVERHEAD = 400
+_POINT_OVERHEAD = 120
+
+
+def freeze_result(result: Dict[str, Any]) -> Mapping[str, Any]:
+    """
+    Make a read-only copy of a parse result that can be shared between sessions.
+
+    Elements become read-only mappings in a tuple and coordinates become
+    tuples, so code holding a shared result cannot change it by accident.
+
+    Args:
+        result: Parse result from parse_single_tiff
+
+    Returns:
+        Read-only view of the result
+    """
+    elements = tuple(
+        MappingProxyType({
+            **element,
+            'coordinates': tuple(tuple(p) for p in element['coordinates'])
+            if element['coordinates'] is not None else None
+        })
+        for element in result['elements']
+    )
+    return MappingProxyType({**result, 'elements': elements})
+
+
+def estimate_result_size(result: Mapping[str, Any]) -> int:
+    """
+    Estimate the memory used by a parse result.
+
+    Args:
+        result: Parse result
+
+    Returns:
+        Approximate size in bytes
+    """
+    size = len(result.get('full_text', ''))
+    for element in result['elements']:
+        size += _ELEMENT_OVERHEAD + len(element['text'])
+        if element['coordinates'] is not None:
+            size += _POINT_OVERHEAD * len(element['coordinates'])
+    return size
+
+
+class SharedResultStore:
+    """
+    Process-wide store of read-only parse results.
+
+    One copy of each result is shared by every session; sessions keep only
+    their own edits on top of it. When the estimated size exceeds the cap the
+    least recently used results are evicted, and are reloaded through the
+    loader (e.g. from saved results on disk) the next time they are needed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        loader: Optional[Callable[[Hashable], Optional[Dict[str, Any]]]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, key: Hashable, result: Dict[str, Any]) -> Mapping[str, Any]:
+        """
+        Add a result, unless one is already stored under the key.
+
+        Args:
+            key: Identifies the result (e.g. file path and result key)
+            result: Parse result
+
+        Returns:
+            The shared read-only result stored under the key
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        frozen = freeze_result(result)
+        size = estimate_result_size(frozen)
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+
+            self._entries[key] = frozen
+            self._sizes[key] = size
+            self._total_bytes += size
+
+            # Always keep the newest entry, even if it alone exceeds the cap
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+
+        return frozen
+
+    def get(self, key: Hashable) -> Optional[Mapping[str, Any]]:
+        """
+        Get a shared result, reloading it through the loader if it was evicted.
+
+        Args:
+            key: Key the result was stored under
+
+        Returns:
+            Read-only result, or None if it is not available
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.loader is None:
+            return None
+
+        result = self.loader(key)
+        if result is None:
+            return None
+
+        return self.put(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the current size of the store.
+
+        Returns:
+            Dictionary with the number of 'results' and estimated 'bytes'
+        """
+        with self._lock:
+            return {'results': len(self._entries), 'bytes': self._total_bytes}
@@ -0,0 +1,201 @@
+import io
+import math
+import struct
+from typing import Tuple, Optional
+
+import numpy as np
+from PIL import Image, TiffImagePlugin, TiffTags
+
+# TIFF tags describing the data layout
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+PHOTOMETRIC = 262
+STRIP_OFFSETS = 273
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PLANAR_CONFIGURATION = 284
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+
+# Tags pointing to other places in the file, which are meaningless in a rebuilt TIFF
+_POINTER_TAGS = {330, 513, 514, 34665, 34853, 40965}
+
+# Compression schemes whose strips or tiles can be decoded independently (old-style JPEG cannot)
+_BLOCK_COMPRESSIONS = {1, 2, 3, 4, 5, 7, 8, 32773, 32946}
+
+# Modes that map directly to an array of 8-bit samples, with the photometric interpretation they need
+_MEMMAP_MODES = {'L': (1, 1), 'RGB': (3, 2), 'RGBA': (4, 2)}
+
+
+def _clamp_bbox(bbox: Tuple[float, float, float, float], size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Round a box to whole pixels (as PIL's crop does) and clip it to the image."""
+    width, height = size
+    left, top, right, bottom = (int(round(v)) for v in bbox)
+    left, right = min(max(left, 0), width), min(max(right, 0), width)
+    top, bottom = min(max(top, 0), height), min(max(bottom, 0), height)
+    return left, top, max(left, right), max(top, bottom)
+
+
+def _read_memmap(img: Image.Image, path: str, box: Tuple[int, int, int, int]) -> Optional[Image.Image]:
+    """Slice an uncompressed page stored as one contiguous run of strips."""
+    tags = img.tag_v2
+    if img.mode not in _MEMMAP_MODES or STRIP_OFFSETS not in tags:
+        return None
+
+    bands, photometric = _MEMMAP_MODES[img.mode]
+    bits = tags.get(BITS_PER_SAMPLE, (1,))
+    if (
+        tags.get(COMPRESSION, 1) != 1
+        or tags.get(PLANAR_CONFIGURATION, 1) != 1
+        or tags.get(PHOTOMETRIC) != photometric
+        or tuple(bits) != (8,) * bands
+    ):
+        return None
+
+    width, height = img.size
+    row_bytes = width * bands
+    rows_per_strip = min(tags.get(ROWS_PER_STRIP, height), height)
+    offsets = tags[STRIP_OFFSETS]
+    if any(offset != offsets[0] + i * rows_per_strip * row_bytes for i, offset in enumerate(offsets)):
+        return None
+
+    pixels = np.memmap(path, dtype=np.uint8, mode='r', offset=offsets[0], shape=(height, width, bands))
+    left, top, right, bottom = box
+
+    # Only the pages of the file holding the region are read; the copy is the size of the region
+    region = np.array(pixels[top:bottom, left:right])
+    del pixels
+
+    return Image.fromarray(region[:, :, 0] if bands == 1 else region)
+
+
+def _read_blocks(img: Image.Image, box: Tuple[int, int, int, int]) -> Optional[Image.Image]:
+    """Decode only the strips or tiles that intersect the box."""
+    tags = img.tag_v2
+    if tags.get(COMPRESSION, 1) not in _BLOCK_COMPRESSIONS or tags.get(PLANAR_CONFIGURATION, 1) != 1:
+        return None
+
+    width, height = img.size
+    left, top, right, bottom = box
+
+    if TILE_OFFSETS in tags:
+        block_w, block_h = tags[TILE_WIDTH], tags[TILE_LENGTH]
+        offsets, byte_counts = tags[TILE_OFFSETS], tags[TILE_BYTE_COUNTS]
+        offsets_tag, counts_tag = TILE_OFFSETS, TILE_BYTE_COUNTS
+    elif STRIP_OFFSETS in tags:
+        block_w, block_h = width, min(tags.get(ROWS_PER_STRIP, height), height)
+        offsets, byte_counts = tags[STRIP_OFFSETS], tags[STRIP_BYTE_COUNTS]
+        offsets_tag, counts_tag = STRIP_OFFSETS, STRIP_BYTE_COUNTS
+    else:
+        return None
+
+    blocks_across = math.ceil(width / block_w)
+    col0, col1 = left // block_w, (right - 1) // block_w
+    row0, row1 = top // block_h, (bottom - 1) // block_h
+    indices = [r * blocks_across + c for r in range(row0, row1 + 1) for c in range(col0, col1 + 1)]
+
+    # Rebuild a small TIFF holding only the needed blocks, with the page's other tags
+    data = []
+    for i in indices:
+        img.fp.seek(offsets[i])
+        data.append(img.fp.read(byte_counts[i]))
+
+    relative_offsets = []
+    position = 0
+    for chunk in data:
+        relative_offsets.append(position)
+        position += len(chunk)
+
+    ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=tags.prefix)
+    for tag, value in tags.items():
+        if tag in _POINTER_TAGS or tag in (offsets_tag, counts_tag):
+            continue
+        ifd[tag] = value
+        if tag in tags.tagtype:
+            ifd.tagtype[tag] = tags.tagtype[tag]
+
+    x0, y0 = col0 * block_w, row0 * block_h
+    ifd[IMAGE_WIDTH] = min((col1 + 1) * block_w, width) - x0
+    ifd[IMAGE_LENGTH] = min((row1 + 1) * block_h, height) - y0
+    ifd[offsets_tag] = tuple(relative_offsets)
+    ifd[counts_tag] = tuple(len(chunk) for chunk in data)
+    ifd.tagtype[offsets_tag] = ifd.tagtype[counts_tag] = TiffTags.LONG
+
+    # The IFD follows the header and the blocks follow the IFD. PIL makes
+    # strip offsets relative to the end of the IFD itself, tile offsets are
+    # written as given and need the IFD size first.
+    header_size = 8
+    ifd_bytes = ifd.tobytes(header_size)
+    if offsets_tag == TILE_OFFSETS:
+        ifd[offsets_tag] = tuple(header_size + len(ifd_bytes) + o for o in relative_offsets)
+        ifd_bytes = ifd.tobytes(header_size)
+
+    endian = '<' if tags.prefix == b'II' else '>'
+    buffer = io.BytesIO()
+    buffer.write(tags.prefix + struct.pack(endian + 'HL', 42, header_size))
+    buffer.write(ifd_bytes)
+    buffer.write(b''.join(data))
+    buffer.seek(0)
+
+    sub = Image.open(buffer)
+    sub.load()
+    return sub.crop((left - x0, top - y0, right - x0, bottom - y0))
+
+
+def read_tiff_region(image_path: str, bbox: Tuple[float, float, float, float]) -> Image.Image:
+    """
+    Read a rectangular region of a page without decoding the whole page.
+
+    Uncompressed 8-bit pages stored as contiguous strips are memory-mapped and
+    sliced. Other strip or tile organized TIFFs have only the strips or tiles
+    intersecting the box decoded. Any other file is fully decoded and cropped.
+
+    Args:
+        image_path: Path to the image file
+        bbox: Region as (left, top, right, bottom) in pixels
+
+    Returns:
+        PIL Image of the region, identical to Image.open(image_path).crop(bbox)
+        for boxes inside the page
+    """
+    img = Image.open(image_path)
+    box = _clamp_bbox(bbox, img.size)
+    left, top, right, bottom = box
+
+    try:
+        if img.format == 'TIFF' and right > left and bottom > top:
+            region = _read_memmap(img, image_path, box)
+            if region is None:
+                region = _read_blocks(img, box)
+            if region is not None:
+                return region
+    except (OSError, ValueError, KeyError, SyntaxError) as e:
+        print(f"Region read failed for {image_path}, decoding the full page: {e}")
+        img = Image.open(image_path)
+
+    return img.crop(box)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    arg_parser = argparse.ArgumentParser(description="Compare region reads with full page decodes")
+    arg_parser.add_argument("image", help="Path to a TIFF file")
+    arg_parser.add_argument("box", nargs=4, type=float, metavar=("LEFT", "TOP", "RIGHT", "BOTTOM"))
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    region = read_tiff_region(args.image, tuple(args.box))
+    region_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = Image.open(args.image).crop(_clamp_bbox(tuple(args.box), Image.open(args.image).size))
+    full_s = time.perf_counter() - start
+
+    print(f"Region read: {region_s * 1000:.1f} ms | Full decode: {full_s * 1000:.1f} ms")
+    print(f"Identical: {np.array_equal(np.asarray(region), np.asarray(full))}")
@@ -1,22 +1,59 @@
-from typing import Dict, Any, List, Tuple
-import copy
+from typing import Dict, Any, List, Tuple, Optional, Sequence, Mapping
+import math
+import hashlib
 
 
-def initialize_edit_tracking(file_data: Dict[str, Any]) -> Dict[str, Any]:
+def initialize_edit_tracking() -> Dict[str, Any]:
     """
     Initialize edit tracking for a file's elements.
     
+    Only edited elements are kept, by index, as edited copies. The elements
+    of the parse result are not referenced, so the result can be shared
+    read-only between sessions and freed when the shared store evicts it;
+    get_current_elements combines the edits with the result on each rerun.
+    
+    Returns:
+        Dictionary with the edited elements by index
+    """
+    return {'edited': {}}
+
+
+def get_current_elements(
+    edit_tracking: Dict[str, Any],
+    elements: Sequence[Mapping[str, Any]]
+) -> List[Mapping[str, Any]]:
+    """
+    Get the elements of a file with its edits applied.
+    
     Args:
-        file_data: Original parsed file data
+        edit_tracking: Edit tracking dictionary
+        elements: Elements of the parse result the edits were made on
         
     Returns:
-        Dictionary with original and working copy of elements
+        New list holding the edited copies and the unedited original elements
     """
-    return {
-        'original': copy.deepcopy(file_data['elements']),
-        'current': copy.deepcopy(file_data['elements']),
-        'edited_indices': set()
-    }
+    edited = edit_tracking['edited']
+    if not edited:
+        return list(elements)
+    return [edited.get(idx, element) for idx, element in enumerate(elements)]
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 hash of a file's content.
+    
+    Args:
+        file_path: Path to the file
+        chunk_size: Number of bytes to read at a time
+        
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def update_element_type(
@@ -27,6 +64,8 @@ def update_element_type(
     """
     Update the type of a specific element.
     
+    The element is replaced by an updated copy rather than changed in place.
+    
     Args:
         elements: List of element dictionaries
         element_index: Index of element to update (0-based)
@@ -36,7 +75,7 @@ def update_element_type(
         Updated list of elements
     """
     if 0 <= element_index < len(elements):
-        elements[element_index]['type'] = new_type
+        elements[element_index] = {**elements[element_index], 'type': new_type}
     return elements
 
 
@@ -48,6 +87,8 @@ def replace_element_with_reparsed(
     """
     Replace an element's text with newly parsed content.
     
+    The element is replaced by an updated copy rather than changed in place.
+    
     Args:
         elements: List of element dictionaries
         element_index: Index of element to replace
@@ -57,7 +98,7 @@ def replace_element_with_reparsed(
         Updated list of elements
     """
     if 0 <= element_index < len(elements):
-        elements[element_index]['text'] = new_text
+        elements[element_index] = {**elements[element_index], 'text': new_text}
     return elements
 
 
@@ -126,23 +167,123 @@ def get_bounding_box_size(coordinates: List[Tuple[float, float]]) -> Tuple[int,
     return int(width), int(height)
 
 
-def get_edit_summary(edit_tracking: Dict[str, Any]) -> str:
+def summarize_element(index: int, element: Dict[str, Any], edited: bool) -> Dict[str, Any]:
+    """
+    Build the table row shown for an element.
+    
+    Args:
+        index: Index of the element (0-based)
+        element: Element dictionary
+        edited: Whether the element has been edited
+        
+    Returns:
+        Dictionary with the element's table columns
+    """
+    text = element['text']
+    return {
+        'Number': index + 1,
+        'Type': element['type'],
+        'Text Preview': text[:100] + '...' if len(text) > 100 else text,
+        'Has Coordinates': element['coordinates'] is not None,
+        'Edited': edited
+    }
+
+
+def get_element_summaries(
+    edit_tracking: Dict[str, Any],
+    current_elements: List[Mapping[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Get the table rows of all current elements, building them on first use.
+    
+    Args:
+        edit_tracking: Edit tracking dictionary
+        current_elements: Elements from get_current_elements
+        
+    Returns:
+        List of rows from summarize_element, one per element
+    """
+    if 'summaries' not in edit_tracking:
+        edit_tracking['summaries'] = [
+            summarize_element(idx, elem, idx in edit_tracking['edited'])
+            for idx, elem in enumerate(current_elements)
+        ]
+    return edit_tracking['summaries']
+
+
+def mark_element_edited(
+    edit_tracking: Dict[str, Any],
+    element_index: int,
+    element: Dict[str, Any]
+) -> None:
+    """
+    Keep the edited copy of an element and refresh only its table row.
+    
+    Args:
+        edit_tracking: Edit tracking dictionary
+        element_index: Index of the edited element
+        element: Edited copy of the element
+    """
+    edit_tracking['edited'][element_index] = element
+    if 'summaries' in edit_tracking:
+        edit_tracking['summaries'][element_index] = summarize_element(element_index, element, True)
+
+
+def filter_element_indices(
+    summaries: List[Dict[str, Any]],
+    element_types: Optional[List[str]] = None
+) -> List[int]:
+    """
+    Get the indices of elements of the selected types.
+    
+    Args:
+        summaries: Rows from get_element_summaries
+        element_types: Types to keep (all elements if None or empty)
+        
+    Returns:
+        List of element indices (0-based)
+    """
+    if not element_types:
+        return list(range(len(summaries)))
+    wanted = set(element_types)
+    return [idx for idx, row in enumerate(summaries) if row['Type'] in wanted]
+
+
+def paginate(items: List[Any], page: int, page_size: int) -> Tuple[List[Any], int]:
+    """
+    Get one page of a list.
+    
+    Args:
+        items: Items to paginate
+        page: Page number (1-based, clamped to the valid range)
+        page_size: Number of items per page
+        
+    Returns:
+        Tuple of (items on the page, number of pages)
+    """
+    page_count = max(1, math.ceil(len(items) / page_size))
+    page = min(max(1, page), page_count)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page_count
+
+
+def get_edit_summary(edit_tracking: Dict[str, Any], original_elements: Sequence[Mapping[str, Any]]) -> str:
     """
     Generate a summary of edits made.
     
     Args:
         edit_tracking: Edit tracking dictionary
+        original_elements: Elements of the parse result the edits were made on
         
     Returns:
         Formatted string summary
     """
-    if not edit_tracking['edited_indices']:
+    if not edit_tracking['edited']:
         return "No edits made"
     
     summary_parts = []
-    for idx in sorted(edit_tracking['edited_indices']):
-        original = edit_tracking['original'][idx]
-        current = edit_tracking['current'][idx]
+    for idx, current in sorted(edit_tracking['edited'].items()):
+        original = original_elements[idx]
         
         changes = []
         if original['type'] != current['type']:
@@ -1,8 +1,10 @@
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 from pathlib import Path
 import numpy as np
 
+from tiff_roi import read_tiff_region
+
 COLOR_SCHEMES = {
     'Default': {
         'Title': (255, 0, 0),        # Red
@@ -195,6 +197,103 @@ def draw_box_comparison(
     return result.convert('RGB')
 
 
+def draw_box_comparison_crop(
+    image_path: str,
+    original_coords: List[Tuple[float, float]],
+    adjusted_coords: List[Tuple[float, float]],
+    padding: int = 60,
+    box_width: int = 3
+) -> Image.Image:
+    """
+    Draw original and adjusted bounding boxes on a window around them.
+    
+    Only a padded window around the union of both boxes is read from the file,
+    converted and composited, so the cost depends on the box size rather than
+    the page size and the result is legible at display size.
+    
+    Args:
+        image_path: Path to the image file
+        original_coords: Original bounding box coordinates
+        adjusted_coords: Adjusted bounding box coordinates
+        padding: Pixels of context to show around the boxes
+        box_width: Thickness of the bounding box lines
+        
+    Returns:
+        PIL Image of the window showing both boxes
+    """
+    # Window around the union of both boxes (opening the file reads only its header)
+    width, height = Image.open(image_path).size
+    xs = [p[0] for p in original_coords] + [p[0] for p in adjusted_coords]
+    ys = [p[1] for p in original_coords] + [p[1] for p in adjusted_coords]
+    left = max(0, int(min(xs)) - padding)
+    top = max(0, int(min(ys)) - padding)
+    right = min(width, int(np.ceil(max(xs))) + padding)
+    bottom = min(height, int(np.ceil(max(ys))) + padding)
+    
+    window = read_tiff_region(image_path, (left, top, right, bottom))
+    if window.mode != 'RGBA':
+        window = window.convert('RGBA')
+    
+    overlay = Image.new('RGBA', window.size, (255, 255, 255, 0))
+    draw = ImageDraw.Draw(overlay)
+    
+    original = [(x - left, y - top) for x, y in original_coords]
+    adjusted = [(x - left, y - top) for x, y in adjusted_coords]
+    
+    draw.polygon(original, outline=(255, 0, 0, 180), width=box_width)
+    draw.polygon(adjusted, outline=(0, 255, 0, 180), width=box_width + 1)
+    
+    try:
+        font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", size=16)
+    except:
+        font = ImageFont.load_default()
+    
+    # Labels go above the boxes, or just inside them when there is no room
+    for label, coords, color in (
+        ("Original", original, (255, 0, 0, 255)),
+        ("Adjusted", adjusted, (0, 255, 0, 255))
+    ):
+        x, y = coords[0]
+        label_y = y - 20 if y >= 20 else y + box_width + 2
+        draw.text((x, label_y), label, fill=color, font=font)
+    
+    result = Image.alpha_composite(window, overlay)
+    
+    return result.convert('RGB')
+
+
+def format_elements_text(
+    elements: List[Dict[str, Any]],
+    show_numbers: bool = True,
+    indices: Optional[List[int]] = None
+) -> str:
+    """
+    Format element texts with their types for display.
+    
+    Args:
+        elements: List of element dictionaries
+        show_numbers: Whether to prefix each element with its number
+        indices: Indices of the elements to include (all if None)
+        
+    Returns:
+        Formatted text
+    """
+    if indices is None:
+        indices = range(len(elements))
+    
+    text_parts = []
+    for idx in indices:
+        element = elements[idx]
+        if show_numbers:
+            text_parts.append(f"[{idx + 1}] {element['type']}")
+        else:
+            text_parts.append(f"{element['type']}")
+        text_parts.append(element['text'])
+        text_parts.append("-" * 50)
+    
+    return "\n".join(text_parts)
+
+
 def create_side_by_side_view(
     image_path: str,
     elements: List[Dict[str, Any]],
@@ -227,17 +326,7 @@ def create_side_by_side_view(
         color_scheme
     )
     
-    # Format text with numbers
-    text_parts = []
-    for idx, element in enumerate(elements, 1):
-        if show_numbers:
-            text_parts.append(f"[{idx}] {element['type']}")
-        else:
-            text_parts.append(f"{element['type']}")
-        text_parts.append(element['text'])
-        text_parts.append("-" * 50)
-    
-    formatted_text = "\n".join(text_parts)
+    formatted_text = format_elements_text(elements, show_numbers)
     
     return annotated_img, formatted_text
 
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+import unittest
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).parent
+SRC_DIR = TESTS_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from batch_queue import (
+    create_manifest,
+    get_queue_status,
+    try_claim,
+    release_lease,
+    _remove_lease_if,
+    _read_token,
+    _Heartbeat
+)
+
+
+def fake_parse(file_path: str, **options):
+    """Stand-in for parse_single_tiff used by the worker processes."""
+    name = Path(file_path).name
+    if name == os.environ.get('CRASH_ON'):
+        os._exit(1)
+    if name == os.environ.get('FAIL_ON'):
+        raise ValueError("unreadable page")
+
+    time.sleep(0.05)
+    with open(os.environ['PARSE_LOG'], 'a', encoding='utf-8') as f:
+        f.write(f"{name}\n")
+    return {'filename': name, 'filepath': file_path, 'elements': [], 'full_text': name}
+
+
+class BatchQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.data_dir = root / "data"
+        self.queue_dir = root / "queue"
+        self.parse_log = root / "parsed.txt"
+        self.data_dir.mkdir()
+        for i in range(12):
+            (self.data_dir / f"page{i:02d}.tif").touch()
+        create_manifest(str(self.data_dir), str(self.queue_dir))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def start_worker(self, worker_id: str, **env) -> subprocess.Popen:
+        return subprocess.Popen(
+            [
+                sys.executable, str(SRC_DIR / "batch_queue.py"), "work", str(self.queue_dir),
+                "--worker-id", worker_id,
+                "--parse-fn", "test_batch_queue:fake_parse",
+                "--lease-timeout", "1",
+                "--poll-interval", "0.2"
+            ],
+            env={**os.environ, 'PYTHONPATH': str(TESTS_DIR), 'PARSE_LOG': str(self.parse_log), **env},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def parsed_files(self):
+        return self.parse_log.read_text(encoding='utf-8').split()
+
+    def assert_no_leases_left(self):
+        self.assertEqual(os.listdir(self.queue_dir / "leases"), [])
+
+    def test_workers_parse_every_file_once(self):
+        workers = [self.start_worker(f"w{i}") for i in range(4)]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=60), 0)
+
+        parsed = self.parsed_files()
+        self.assertEqual(sorted(parsed), sorted(set(parsed)))
+        self.assertEqual(len(parsed), 12)
+        self.assertEqual(get_queue_status(str(self.queue_dir))['done'], 12)
+        self.assert_no_leases_left()
+
+    def test_crashed_worker_lease_is_reclaimed(self):
+        crashed = self.start_worker("crasher", CRASH_ON="page03.tif")
+        self.assertEqual(crashed.wait(timeout=60), 1)
+
+        status = get_queue_status(str(self.queue_dir), lease_timeout=1)
+        self.assertEqual(status['running'] + status['stale'], 1)
+
+        workers = [self.start_worker(f"w{i}") for i in range(2)]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=60), 0)
+
+        self.assertIn("page03.tif", self.parsed_files())
+        self.assertTrue((self.queue_dir / "results" / "page03.tif.json").exists())
+        self.assertEqual(get_queue_status(str(self.queue_dir))['done'], 12)
+        self.assert_no_leases_left()
+
+    def test_failed_page_is_recorded(self):
+        worker = self.start_worker("w0", FAIL_ON="page05.tif")
+        self.assertEqual(worker.wait(timeout=60), 0)
+
+        with open(self.queue_dir / "failed" / "page05.tif.json", encoding='utf-8') as f:
+            self.assertIn("unreadable page", json.load(f)['error'])
+        self.assertEqual(get_queue_status(str(self.queue_dir))['failed'], 1)
+
+    def make_stale_lease(self, file_path: str) -> Path:
+        lease_path = self.queue_dir / "leases" / f"{Path(file_path).name}.lease"
+        lease_path.write_text(json.dumps({'token': 'crashed'}), encoding='utf-8')
+        old = time.time() - 60
+        os.utime(lease_path, (old, old))
+        return lease_path
+
+    def test_late_reclaim_keeps_fresh_lease(self):
+        file_path = str(self.data_dir / "page00.tif")
+        lease_path = self.make_stale_lease(file_path)
+
+        # Worker A reclaims the stale lease
+        token = try_claim(str(self.queue_dir), file_path, "a", lease_timeout=10)
+        self.assertIsNotNone(token)
+
+        # Worker B saw the same stale lease before A replaced it and now tries to remove it
+        removed = _remove_lease_if(
+            lease_path,
+            lambda moved_token, moved_age: moved_token == 'crashed' and moved_age >= 10
+        )
+        self.assertFalse(removed)
+        self.assertEqual(_read_token(lease_path), token)
+        self.assertIsNone(try_claim(str(self.queue_dir), file_path, "b", lease_timeout=10))
+
+    def test_concurrent_reclaims_grant_one_lease(self):
+        file_path = str(self.data_dir / "page00.tif")
+        for _ in range(20):
+            self.make_stale_lease(file_path)
+            barrier = threading.Barrier(8)
+            tokens = []
+
+            def claim(worker_id):
+                barrier.wait()
+                tokens.append(try_claim(str(self.queue_dir), file_path, worker_id, lease_timeout=10))
+
+            threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            granted = [token for token in tokens if token is not None]
+            self.assertEqual(len(granted), 1)
+            self.assertTrue(release_lease(str(self.queue_dir), file_path, granted[0]))
+
+    def test_release_keeps_lease_of_another_worker(self):
+        file_path = str(self.data_dir / "page00.tif")
+        token = try_claim(str(self.queue_dir), file_path, "a")
+        self.assertIsNotNone(token)
+
+        # The lease was reclaimed by another worker in the meantime
+        lease_path = self.queue_dir / "leases" / "page00.tif.lease"
+        lease_path.write_text(json.dumps({'token': 'other'}), encoding='utf-8')
+
+        self.assertFalse(release_lease(str(self.queue_dir), file_path, token))
+        self.assertEqual(_read_token(lease_path), 'other')
+
+    def test_heartbeat_survives_lease_moved_aside(self):
+        file_path = str(self.data_dir / "page00.tif")
+        token = try_claim(str(self.queue_dir), file_path, "a")
+        lease_path = self.queue_dir / "leases" / "page00.tif.lease"
+        aside_path = lease_path.with_name("page00.tif.lease.check.aside")
+
+        with _Heartbeat(lease_path, token, interval=0.05):
+            # Another worker checks the lease and puts it back, as in _remove_lease_if
+            os.rename(lease_path, aside_path)
+            time.sleep(0.2)
+            os.link(aside_path, lease_path)
+            os.unlink(aside_path)
+
+            old = time.time() - 60
+            os.utime(lease_path, (old, old))
+            time.sleep(0.2)
+            self.assertLess(time.time() - lease_path.stat().st_mtime, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()